@@ -13,7 +13,7 @@ except ImportError:
 
 from fabsim.lib.fabsim3_cmd_api import fabsim
 
-from plugins.FabMaMiCo.FabMaMiCo import mamico_install, generate_sweep
+from plugins.FabMaMiCo.FabMaMiCo import mamico_install, generate_sweep, local_profiling, put_reduce_engine
 
 
 ##########################################
@@ -140,16 +140,17 @@ def mamico_study_2_filter_multimd(**args):
         # 3. Generate the sweep directory
         generate_sweep(config)
 
-        # 4. Transfer the configuration files to the remote machine
+        # 4. Transfer the configuration files and the reduce engine to the remote machine
         with_config(config)
         execute(put_configs, config)
+        put_reduce_engine(config)
 
         # 5. Update the environment for the postprocessing
         update_environment({
             "mamico_venv": template(env.mamico_venv_template),
-            "reduce_command": "python3",
-            "reduce_script": "reduce.py",
-            "reduce_args": f"--scenario={scenario['domain']}",
+            "reduce_command": "python3 -m",
+            "reduce_script": "postprocess.reduce",
+            "reduce_args": f"reduce.yml --scenario={scenario['domain']}",
         })
 
         # 6. Run the ensemble
@@ -196,16 +197,17 @@ def mamico_study2_gauss(**args):
         # 3. Generate the sweep directory
         generate_sweep(config)
 
-        # 4. Transfer the configuration files to the remote machine
+        # 4. Transfer the configuration files and the reduce engine to the remote machine
         with_config(config)
         execute(put_configs, config)
+        put_reduce_engine(config)
 
         # 5. Update the environment for the postprocessing
         update_environment({
             "mamico_venv": template(env.mamico_venv_template),
-            "reduce_command": "python3",
-            "reduce_script": "reduce.py",
-            "reduce_args": f"--scenario={scenario['domain']}",
+            "reduce_command": "python3 -m",
+            "reduce_script": "postprocess.reduce",
+            "reduce_args": f"reduce.yml --scenario={scenario['domain']}",
         })
 
         # 6. Run the ensemble
@@ -226,15 +228,49 @@ def mamico_study2_gauss_plot(**args):
 
     scenarios = [30, 60]
 
+    with local_profiling("study2_gauss_plot", env.local_results, args):
+        for scenario in scenarios:
+            create_plot(
+                scenario=scenario,
+                oscillations=[2, 5],
+                wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
+                results_dir_gauss=os.path.join(env.local_results, f"fabmamico_study2_gauss_MD{scenario}_hsuper"),
+                results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
+                output_dir=os.path.join(env.local_results, f"fabmamico_study2_gauss_MD{scenario}_hsuper", "plots"),
+                workers=int(args["workers"]) if "workers" in args else None
+            )
+
+
+@task
+@load_plugin_env_vars("FabMaMiCo")
+def mamico_study2_gauss_store(**args):
+    """
+    Run this task on localhost, after fetching the raw outputs of the gauss study.
+    Packs the filter outputs and the vtk series of all runs into one memory-mapped study store per source,
+    see scripts/postprocess/study_store.py.
+    """
+    from plugins.FabMaMiCo.scripts.postprocess.study_store import CFD_SOURCE, build_study_store
+
+    if (env.host != "localhost"):
+        print("Please run this task on localhost.")
+        return
+
+    scenarios = [30, 60]
+
     for scenario in scenarios:
-        create_plot(
-            scenario=scenario,
-            oscillations=[2, 5],
-            wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
-            results_dir_gauss=os.path.join(env.local_results, f"fabmamico_study2_gauss_MD{scenario}_hsuper"),
-            results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
-            output_dir=os.path.join(env.local_results, f"fabmamico_study2_gauss_MD{scenario}_hsuper", "plots")
-        )
+        results_dir_gauss = os.path.join(env.local_results, f"fabmamico_study2_gauss_MD{scenario}_hsuper")
+        runs = [
+            ({"oscillations": osc, "wall_velocity": wv},
+             os.path.join(results_dir_gauss, "RUNS", f"gauss_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"))
+            for osc in [2, 5]
+            for wv in [0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8]
+        ]
+        # One store per source, e.g. 'store/raw-md.npy' and 'store/raw-md.json',
+        # read by study2_gauss/postprocess_vel.py with '--store_dir <results_dir_gauss>/store'
+        for source in ["0_raw-md.csv", "0_gauss-2d.csv", "0_gauss-3d.csv", CFD_SOURCE]:
+            path = os.path.join(results_dir_gauss, "store", source[2:-4] if source != CFD_SOURCE else source)
+            build_study_store(path, runs, source, scenario=scenario)
+            print(f"Saved study store to {path}.npy")
 
 ##########################################
 # POD
@@ -273,16 +309,17 @@ def mamico_study2_pod(**args):
         # 3. Generate the sweep directory
         generate_sweep(config)
 
-        # 4. Transfer the configuration files to the remote machine
+        # 4. Transfer the configuration files and the reduce engine to the remote machine
         with_config(config)
         execute(put_configs, config)
+        put_reduce_engine(config)
 
         # 5. Update the environment for the postprocessing
         update_environment({
             "mamico_venv": template(env.mamico_venv_template),
-            "reduce_command": "python3",
-            "reduce_script": "reduce.py",
-            "reduce_args": f"--scenario={scenario['domain']}",
+            "reduce_command": "python3 -m",
+            "reduce_script": "postprocess.reduce",
+            "reduce_args": f"reduce.yml --scenario={scenario['domain']}",
         })
 
         # 6. Run the ensemble
@@ -303,17 +340,19 @@ def mamico_study2_pod_plot(**args):
 
     scenarios = [30, 60]
 
-    for scenario in scenarios:
-        create_plot(
-            scenario=scenario,
-            oscillations=[2, 5],
-            wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
-            time_window_sizes=[10, 20, 30, 40, 50, 60, 70, 80],
-            k_maxs=[1, 2, 3],
-            results_dir_pod=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper"),
-            results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
-            output_dir=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper", "plots")
-        )
+    with local_profiling("study2_pod_plot", env.local_results, args):
+        for scenario in scenarios:
+            create_plot(
+                scenario=scenario,
+                oscillations=[2, 5],
+                wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
+                time_window_sizes=[10, 20, 30, 40, 50, 60, 70, 80],
+                k_maxs=[1, 2, 3],
+                results_dir_pod=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper"),
+                results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
+                output_dir=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper", "plots"),
+                workers=int(args["workers"]) if "workers" in args else None
+            )
 
 
 @task
@@ -327,17 +366,19 @@ def mamico_study2_pod_plot_selected(**args):
 
     scenarios = [30, 60]
 
-    for scenario in scenarios:
-        create_plot(
-            scenario=scenario,
-            oscillations=[2, 5],
-            wall_velocities=[0.2, 1.0, 1.8],
-            time_window_sizes=[10, 20, 30, 40, 50, 60, 70, 80],
-            k_maxs=[1, 2, 3],
-            results_dir_pod=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper"),
-            results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
-            output_dir=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper", "plots")
-        )
+    with local_profiling("study2_pod_plot_selected", env.local_results, args):
+        for scenario in scenarios:
+            create_plot(
+                scenario=scenario,
+                oscillations=[2, 5],
+                wall_velocities=[0.2, 1.0, 1.8],
+                time_window_sizes=[10, 20, 30, 40, 50, 60, 70, 80],
+                k_maxs=[1, 2, 3],
+                results_dir_pod=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper"),
+                results_dir_multimd=os.path.join(env.local_results, f"fabmamico_study2_multimd_MD{scenario}_hsuper"),
+                output_dir=os.path.join(env.local_results, f"fabmamico_study2_pod_MD{scenario}_hsuper", "plots"),
+                workers=int(args["workers"]) if "workers" in args else None
+            )
 
 ##########################################
 # NLM time-window-size
@@ -376,16 +417,17 @@ def mamico_study2_pod_plot_selected(**args):
 #         # 3. Generate the sweep directory
 #         generate_sweep(config)
 
-#         # 4. Transfer the configuration files to the remote machine
+#         # 4. Transfer the configuration files and the reduce engine to the remote machine
 #         with_config(config)
 #         execute(put_configs, config)
+#         put_reduce_engine(config)
 
 #         # 5. Update the environment for the postprocessing
 #         update_environment({
 #             "mamico_venv": template(env.mamico_venv_template),
-#             "reduce_command": "python3",
-#             "reduce_script": "reduce.py",
-#             "reduce_args": f"--scenario={scenario['domain']}",
+#             "reduce_command": "python3 -m",
+#             "reduce_script": "postprocess.reduce",
+#             "reduce_args": f"reduce.yml --scenario={scenario['domain']}",
 #         })
 
 #         # 6. Run the ensemble
@@ -480,16 +522,17 @@ def mamico_study2_nlm(**args):
         # 3. Generate the sweep directory
         generate_sweep(config)
 
-        # 4. Transfer the configuration files to the remote machine
+        # 4. Transfer the configuration files and the reduce engine to the remote machine
         with_config(config)
         execute(put_configs, config)
+        put_reduce_engine(config)
 
         # 5. Update the environment for the postprocessing
         update_environment({
             "mamico_venv": template(env.mamico_venv_template),
-            "reduce_command": "python3",
-            "reduce_script": "reduce.py",
-            "reduce_args": f"--scenario={scenario['domain']}",
+            "reduce_command": "python3 -m",
+            "reduce_script": "postprocess.reduce",
+            "reduce_args": f"reduce.yml --scenario={scenario['domain']}",
         })
 
         # 6. Run the ensemble
@@ -510,17 +553,19 @@ def mamico_study2_nlm_plot(**args):
 
     scenarios = [30, 60]
 
-    for scenario in scenarios:
-        create_plot(
-            scenario=scenario,
-            oscillations=[2, 5],
-            wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
-            hsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-            sigsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-            tws=5,
-            results_dir_nlm_sq=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper"),
-            output_dir=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper", "plots")
-        )
+    with local_profiling("study2_nlm_plot", env.local_results, args):
+        for scenario in scenarios:
+            create_plot(
+                scenario=scenario,
+                oscillations=[2, 5],
+                wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
+                hsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                sigsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                tws=5,
+                results_dir_nlm_sq=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper"),
+                output_dir=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper", "plots"),
+                workers=int(args["workers"]) if "workers" in args else None
+            )
 
 
 @task
@@ -534,14 +579,16 @@ def mamico_study2_nlm_plot_selected(**args):
 
     scenarios = [30, 60]
 
-    for scenario in scenarios:
-        create_plot(
-            scenario=scenario,
-            oscillations=[2, 5],
-            wall_velocities=[0.2, 0.8, 1.4, 1.8],
-            hsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-            sigsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-            tws=5,
-            results_dir_nlm_sq=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper"),
-            output_dir=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper", "plots")
-        )
+    with local_profiling("study2_nlm_plot_selected", env.local_results, args):
+        for scenario in scenarios:
+            create_plot(
+                scenario=scenario,
+                oscillations=[2, 5],
+                wall_velocities=[0.2, 0.8, 1.4, 1.8],
+                hsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                sigsq_rel=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                tws=5,
+                results_dir_nlm_sq=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper"),
+                output_dir=os.path.join(env.local_results, f"fabmamico_study2_nlm_MD{scenario}_hsuper", "plots"),
+                workers=int(args["workers"]) if "workers" in args else None
+            )
@@ -2,7 +2,12 @@
 #
 # This file contains FabSim definitions specific to FabMaMiCo.
 
+import hashlib
 import os
+import shutil
+import tempfile
+
+from contextlib import contextmanager
 
 try:
     from fabsim.base.fab import *
@@ -47,6 +52,12 @@ def load_args_from_config(config: str, overwrite_nested: bool = True) -> None:
         )
 
 
+def is_enabled(value) -> bool:
+    '''
+    Whether a boolean task argument is set, as FabSim passes all arguments as strings (e.g. `packed=false`).
+    '''
+    return str(value).lower() in ("true", "1", "yes")
+
 
 ##################################################################################################
 ############################# Plugin Installation Verification ###################################
@@ -577,7 +588,7 @@ def mamico_run_ensemble(config: str, **args):
     load_args_from_config(config)
     update_environment(args)
 
-    generate_sweep()
+    generate_sweep(config)
 
     # make sure MaMiCo is installed
     mamico_install(config, **args)
@@ -601,6 +612,10 @@ def mamico_run_ensemble(config: str, **args):
 def mamico_install_venv(**args):
     """
     Create a virtual environment for Python and install the required packages.
+    With `packed=true`, the packages are additionally packed into a relocatable runtime
+    (a single tar archive with precompiled bytecode) next to the virtual environment.
+    Reduce jobs unpack it once per node to the node-local $TMPDIR and import from there,
+    instead of importing from the virtual environment on the shared filesystem.
     """
     # TODO: Add miniconda installation (?)
     # create the config_files directory and copy the requirements_remote.txt file there
@@ -620,6 +635,17 @@ def mamico_install_venv(**args):
         f"pip install -r {env.job_config_path}/requirements.txt",
         # f"rm -rf {env.job_config_path}/"
     ])
+    if is_enabled(args.get("packed", False)):
+        runtime = os.path.join(env.mamico_venv, reduce_runtime_name())
+        env['venv_setup_commands'] += "\n" + "\n".join([
+            f"rm -rf {runtime}",
+            f"pip install --no-compile --target {runtime} -r {env.job_config_path}/requirements.txt",
+            # the bytecode stays valid regardless of the modification times after unpacking
+            f"python3 -m compileall -q -j 0 --invalidation-mode unchecked-hash {runtime}",
+            f"tar -cf {runtime}.tar.tmp -C {runtime} .",
+            f"mv {runtime}.tar.tmp {runtime}.tar",
+            f"rm -rf {runtime}",
+        ])
     # submit the job
     # TODO: is it a requirement to install via job and not via bash?
     env['job_dispatch'] = "bash -l -c"
@@ -631,6 +657,8 @@ def mamico_install_venv(**args):
 def mamico_postprocess(config: str, script: str = "postprocess.py", py_args: str = "", **args):
     """
     Run a postprocessing Pyhon script in the given config-directory.
+    With `profile=true` (and optionally `cprofile=true`), the walltime and the peak memory of the script
+    are written to `<script>_profile.json` in the results directory, see scripts/postprocess/profiling.py.
     """
     update_environment(args)
 
@@ -652,15 +680,60 @@ def mamico_postprocess(config: str, script: str = "postprocess.py", py_args: str
     # please only transfer the postprocess script
     put(os.path.join(env.localplugins['FabMaMiCo'], "config_files", config, script), env.job_config_path)
 
+    # optionally run the script through the profiler
+    env['reduce_env_setup'] = reduce_env_setup(template(env.mamico_venv_template))
+    postprocess_profiler = ""
+    if profile_enabled() or profile_enabled("cprofile"):
+        put(os.path.join(env.localplugins['FabMaMiCo'], "scripts", "postprocess", "profiling.py"), env.job_config_path)
+        postprocess_profiler = os.path.join(env.job_config_path, "profiling.py")
+        if profile_enabled("cprofile"):
+            postprocess_profiler += " --cprofile"
+
     # submit the job
     job_args = {
         'script': 'postprocess',
         'postprocess_script': script,
-        'postprocess_args': py_args
+        'postprocess_args': py_args,
+        'postprocess_profiler': postprocess_profiler,
     }
     job(job_args, args)
 
 
+@task
+@load_plugin_env_vars("FabMaMiCo")
+def mamico_results_index(results_dir: str, config: str = None, **args):
+    """
+    Scan all runs of a fetched study once and (re)build its SQLite results index `<results_dir>/results.sqlite`.
+    The plot tasks query the index instead of opening the result files of every run.
+    `results_dir` is absolute or relative to the local results directory.
+    If `config` is given, the parameters listed in its reduce.yml are also read from the couette.xml
+    of runs that were reduced without a reduce summary.
+    """
+    from plugins.FabMaMiCo.scripts.postprocess.results_index import ResultsIndex, build_results_index
+
+    update_environment(args)
+    results_dir = os.path.join(env.local_results, results_dir)
+
+    parameters = []
+    if config is not None:
+        reduce_yml = os.path.join(env.localplugins['FabMaMiCo'], "config_files", config, "reduce.yml")
+        with open(reduce_yml, "r") as f:
+            parameters = (yaml.safe_load(f) or {}).get("parameters", [])
+
+    path = build_results_index(results_dir, parameters, workers=int(args["workers"]) if "workers" in args else None)
+    index = ResultsIndex(path)
+    (n_runs,), = index.query("SELECT COUNT(*) FROM runs")
+    rich_print(
+        Panel(
+            f"Indexed {n_runs} runs with the parameters {list(index.columns)} in '{path}'.",
+            title="Results index",
+            border_style="green",
+            expand=False,
+        )
+    )
+    index.close()
+
+
 ##################################################################################################
 ################################### MaMiCo monitoring ############################################
 ##################################################################################################
@@ -708,8 +781,10 @@ def mamico_jobs_cancel_all(**args):
 
 
 def generate_sweep(config):
-    # populate SWEEP directory if a generate_ensemble.py script exists
-    if os.path.exists(os.path.join(env.localplugins['FabMaMiCo'], "config_files", config, "generate_ensemble.py")):
+    # populate SWEEP directory from the sweep.yml specification (see utils/sweep.py),
+    # or by the generate_ensemble.py script of configs without a specification
+    config_dir = os.path.join(env.localplugins['FabMaMiCo'], "config_files", config)
+    if os.path.exists(os.path.join(config_dir, "sweep.yml")) or os.path.exists(os.path.join(config_dir, "generate_ensemble.py")):
         rich_print(
             Panel(
                 f"Generating configurations in SWEEP directory for config '{config}'",
@@ -718,7 +793,11 @@ def generate_sweep(config):
                 expand=False,
             )
         )
-        local(f"python3 {os.path.join(env.localplugins['FabMaMiCo'], 'config_files', config, 'generate_ensemble.py')}")
+        if os.path.exists(os.path.join(config_dir, "sweep.yml")):
+            from plugins.FabMaMiCo.utils.sweep import generate_sweep_from_spec
+            generate_sweep_from_spec(config_dir)
+        else:
+            local(f"python3 {os.path.join(config_dir, 'generate_ensemble.py')}")
         rich_print(
             Panel(
                 f"Generated configurations in SWEEP directory for config '{config}'",
@@ -730,7 +809,7 @@ def generate_sweep(config):
     else:
         rich_print(
             Panel(
-                f"No generate_ensemble.py script found for config '{config}'",
+                f"No sweep.yml or generate_ensemble.py script found for config '{config}'",
                 title="No ensemble generation",
                 border_style="red",
                 expand=False,
@@ -738,6 +817,117 @@ def generate_sweep(config):
         )
 
 
+def reduce_runtime_name():
+    """
+    Name of the packed reduce runtime, see `mamico_install_venv`.
+    It changes with the remote requirements, so that outdated node-local copies are not reused.
+    """
+    with open(os.path.join(env.localplugins['FabMaMiCo'], "requirements_remote.txt"), "rb") as f:
+        checksum = hashlib.sha1(f.read()).hexdigest()[:10]
+    return f"reduce_runtime_{checksum}"
+
+
+def reduce_env_setup(mamico_venv):
+    """
+    Bash commands preparing the Python environment of the reduce engine within a job.
+    The virtual environment is always activated, so that `python3` is the interpreter
+    the packed runtime was built and compiled with (see `mamico_install_venv`).
+    If a packed runtime exists, it is unpacked once per node to the node-local $TMPDIR
+    (concurrent jobs on the same node wait for the first one) and put in front of the virtual environment
+    on the PYTHONPATH.
+
+    Args:
+        mamico_venv (str): The remote path of the virtual environment.
+
+    Returns:
+        str: The bash commands.
+    """
+    name = reduce_runtime_name()
+    archive = os.path.join(mamico_venv, f"{name}.tar")
+    return "\n".join([
+        f"source {mamico_venv}/bin/activate",
+        f"if [ -f {archive} ]; then",
+        f"  runtime=\"${{TMPDIR:-/tmp}}/{name}\"",
+        f"  mkdir -p \"$runtime\"",
+        f"  (",
+        f"    flock 9",
+        f"    [ -f \"$runtime/.unpacked\" ] || {{ tar -xf {archive} -C \"$runtime\" && touch \"$runtime/.unpacked\"; }}",
+        f"  ) 9>\"$runtime.lock\"",
+        f"  export PYTHONPATH=\"$runtime${{PYTHONPATH:+:$PYTHONPATH}}\"",
+        f"fi",
+    ])
+
+
+def profile_enabled(name="profile"):
+    """
+    Whether the profiling option (`profile=true` or `cprofile=true`) is set in the environment.
+    """
+    return is_enabled(env.get(name, False))
+
+
+@contextmanager
+def local_profiling(name, folder, args):
+    """
+    Profiles the enclosed local postprocessing with `profile=true` (and optionally `cprofile=true`):
+    the time of the phases of the postprocessing modules (e.g. `load_run`, `index_build`, `index_query`)
+    and the peak memory are written to `<folder>/<name>_profile.json`, see scripts/postprocess/profiling.py.
+    """
+    from plugins.FabMaMiCo.scripts.postprocess.profiling import Profiler, activate
+
+    cprofile = is_enabled(args.get("cprofile", False))
+    profiler = Profiler(name, enabled=cprofile or is_enabled(args.get("profile", False)), cprofile=cprofile)
+    activate(profiler)
+    try:
+        yield profiler
+    finally:
+        activate(Profiler(enabled=False))
+        if profiler.enabled:
+            os.makedirs(folder, exist_ok=True)
+            profiler.write(folder)
+
+
+# Modules of scripts/postprocess imported by `python3 -m postprocess.reduce`
+REDUCE_ENGINE_MODULES = [
+    "reduce.py", "readers.py", "vtk_reader.py", "couette_config.py", "metrics.py",
+    "summary.py", "retention.py", "profiling.py", "cache.py", "parallel.py",
+]
+
+
+def put_reduce_engine(config):
+    """
+    Transfer the modules of the reduce engine to the remote config directory as package `postprocess`,
+    without the plot scripts and local caches of scripts/postprocess, so that every run of the ensemble can execute `python3 -m postprocess.reduce reduce.yml`,
+    and set up the Python environment of the reduce jobs (`reduce_env_setup`).
+    With `profile=true` (and optionally `cprofile=true`), every run writes the time per phase
+    and the peak memory of its reduction to `reduce_profile.json` (`reduce_profile_args`).
+    Must be called after `with_config(config)` and `update_environment(args)`.
+    """
+    env['reduce_env_setup'] = reduce_env_setup(template(env.mamico_venv_template))
+    env['reduce_profile_args'] = ""
+    if profile_enabled() or profile_enabled("cprofile"):
+        env['reduce_profile_args'] = "--profile --cprofile" if profile_enabled("cprofile") else "--profile"
+    if not os.path.exists(os.path.join(env.localplugins['FabMaMiCo'], "config_files", config, "reduce.yml")):
+        rich_print(
+            Panel(
+                f"No reduce.yml found for config '{config}', the runs will not be reduced.",
+                title="No reduction",
+                border_style="red",
+                expand=False,
+            )
+        )
+        return
+    # stage the modules locally, so that they are transferred at once
+    staging_dir = tempfile.mkdtemp(prefix="fabmamico_reduce_")
+    try:
+        package_dir = os.path.join(staging_dir, "postprocess")
+        os.mkdir(package_dir)
+        for module in REDUCE_ENGINE_MODULES:
+            shutil.copy2(os.path.join(env.localplugins['FabMaMiCo'], "scripts", "postprocess", module), package_dir)
+        put(package_dir, env.job_config_path)
+    finally:
+        shutil.rmtree(staging_dir)
+
+
 @task
 @load_plugin_env_vars("FabMaMiCo")
 def mamico_install_user_spack(**args):
@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+
+from typing import *
+
+########################################
+# Per-run cache of the parsed postprocessing inputs.
+# Each cached array is stored column-wise (one array per quantity) in an
+# uncompressed NPZ file in the '.postprocess_cache' folder of the run,
+# together with the size and mtime of every source file it was built from.
+
+CACHE_DIR = ".postprocess_cache"
+
+# Increase whenever the layout of the cached arrays changes
+CACHE_VERSION = 1
+
+
+def source_stamp(paths):
+    """
+    Returns a stamp identifying the current state of the given source files.
+
+    Args:
+        paths (Iterable[str]): The paths to the source files.
+
+    Returns:
+        str: The stamp, containing name, size and mtime of each file.
+    """
+    stamp = { "version": CACHE_VERSION, "sources": [] }
+    for path in paths:
+        st = os.stat(path)
+        stamp["sources"].append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+    return json.dumps(stamp)
+
+
+def load_or_build(folder, name, sources, quantities, build):
+    """
+    Loads an array from the cache of a run, or builds and caches it.
+    The cache entry is rebuilt if any source file was added, removed, or changed in size or mtime.
+    If the cache cannot be written (e.g. read-only results), the built array is returned uncached.
+
+    Args:
+        folder (str): The run directory.
+        name (str): The name of the cache entry.
+        sources (Iterable[str]): The paths to the source files of the array.
+        quantities (List[str]): The names of the quantities along the last axis.
+        build (Callable[[], np.ndarray]): Builds the array from the source files.
+
+    Returns:
+        np.ndarray: The array of shape (..., quantity).
+    """
+    path = os.path.join(folder, CACHE_DIR, f"{name}.npz")
+    stamp = source_stamp(sources)
+
+    try:
+        with np.load(path) as npz:
+            if str(npz["stamp"]) == stamp:
+                return np.stack([npz[q] for q in quantities], axis=-1)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    data = build()
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so that concurrent readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, stamp=np.array(stamp), **{ q: data[..., k] for k, q in enumerate(quantities) })
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+    return data
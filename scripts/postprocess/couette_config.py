@@ -0,0 +1,161 @@
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from typing import *
+
+########################################
+# Geometry of the MD window and unit conversion of a run, derived from its couette.xml.
+# The LB grid has one ghost layer, so the LB cell of the MD domain offset is
+# domain-offset / cell-size + 1. The filters only see the inner MD cells,
+# i.e. the MD domain without the innermost overlap layer on each side.
+
+# Name of the MaMiCo configuration within a run directory
+COUETTE_XML = "couette.xml"
+
+# Geometry of the study scenarios, used for runs without a couette.xml
+_SCENARIO_DEFAULTS = {
+    30: { "cell_size": 2.5, "domain_size": 30.0, "domain_offset": (10.0, 10.0, 2.5), "dt": 0.005, "number_of_timesteps": 50, "overlap": 3 },
+    60: { "cell_size": 5.0, "domain_size": 60.0, "domain_offset": (20.0, 20.0, 5.0), "dt": 0.005, "number_of_timesteps": 100, "overlap": 3 },
+}
+
+
+class CouetteGeometry(NamedTuple):
+    """
+    Geometry of the inner MD cells within the LB grid of a run.
+
+    Attributes:
+        cell_size (np.ndarray): Size of the LB (macroscopic) cells in x, y, z direction.
+        md_cells (np.ndarray): Number of inner MD cells in x, y, z direction.
+        md_cell_offsets (np.ndarray): LB cell index of the first inner MD cell in x, y, z direction.
+        velocity_factor (float): Factor converting LB velocities (vtk) to MaMiCo units, dx_lb / dt_lb.
+    """
+    cell_size: np.ndarray
+    md_cells: np.ndarray
+    md_cell_offsets: np.ndarray
+    velocity_factor: float
+
+
+# Geometry per run directory
+_geometries: Dict[str, CouetteGeometry] = {}
+
+
+def _vector(value):
+    """
+    Parses a MaMiCo vector attribute, e.g. '2.5 ; 2.5 ; 2.5'.
+    """
+    return np.array([float(v) for v in value.split(";")])
+
+
+def _find_attribute(root, path, attribute):
+    element = root.find(path)
+    if element is None or attribute not in element.attrib:
+        raise KeyError(f"Missing attribute '{attribute}' of '{path}' in {COUETTE_XML}.")
+    return element.attrib[attribute]
+
+
+def compute_geometry(cell_size, domain_size, domain_offset, dt, number_of_timesteps, overlap):
+    """
+    Computes the geometry of the inner MD cells from the MaMiCo configuration values.
+
+    Args:
+        cell_size (ArrayLike): The size of the macroscopic cells.
+        domain_size (ArrayLike): The size of the MD domain.
+        domain_offset (ArrayLike): The offset of the MD domain.
+        dt (float): The MD time step.
+        number_of_timesteps (int): The number of MD time steps per coupling cycle.
+        overlap (int): The innermost overlap layer of the momentum insertion.
+
+    Returns:
+        CouetteGeometry: The geometry of the inner MD cells.
+    """
+    cell_size = np.broadcast_to(np.asarray(cell_size, dtype=float), (3,))
+    domain_size = np.broadcast_to(np.asarray(domain_size, dtype=float), (3,))
+    domain_offset = np.broadcast_to(np.asarray(domain_offset, dtype=float), (3,))
+    md_cells = np.rint(domain_size / cell_size).astype(int) - 2 * overlap
+    md_cell_offsets = np.rint(domain_offset / cell_size).astype(int) + 1 + overlap
+    if (md_cells <= 0).any():
+        raise ValueError(f"The MD domain {domain_size} contains no inner cells.")
+    return CouetteGeometry(
+        cell_size=cell_size,
+        md_cells=md_cells,
+        md_cell_offsets=md_cell_offsets,
+        velocity_factor=float(cell_size[0] / (dt * number_of_timesteps)),
+    )
+
+
+def read_couette_geometry(folder, scenario=30):
+    """
+    Returns the geometry of the inner MD cells of a run.
+    The couette.xml of the run directory is parsed once and the result is reused.
+    Runs without a couette.xml fall back to the geometry of the given study scenario.
+
+    Args:
+        folder (str): The run directory.
+        scenario (int): The scenario number, used if the run contains no couette.xml.
+
+    Returns:
+        CouetteGeometry: The geometry of the inner MD cells.
+    """
+    path = os.path.join(os.path.abspath(folder), COUETTE_XML)
+    if not os.path.isfile(path):
+        if scenario not in _SCENARIO_DEFAULTS:
+            raise FileNotFoundError(f"'{path}' not found and scenario {scenario} has no default geometry.")
+        return compute_geometry(**_SCENARIO_DEFAULTS[scenario])
+
+    geometry = _geometries.get(path)
+    if geometry is not None:
+        return geometry
+
+    root = ET.parse(path).getroot()
+    geometry = compute_geometry(
+        cell_size=_vector(_find_attribute(root, "mamico/macroscopic-cell-configuration", "cell-size")),
+        domain_size=_vector(_find_attribute(root, "molecular-dynamics/domain-configuration", "domain-size")),
+        domain_offset=_vector(_find_attribute(root, "molecular-dynamics/domain-configuration", "domain-offset")),
+        dt=float(_find_attribute(root, "molecular-dynamics/simulation-configuration", "dt")),
+        number_of_timesteps=int(_find_attribute(root, "molecular-dynamics/simulation-configuration", "number-of-timesteps")),
+        overlap=int(_find_attribute(root, "mamico/momentum-insertion", "innermost-overlap-layer")),
+    )
+    _geometries[path] = geometry
+    return geometry
+
+
+def read_couette_parameters(folder, keys):
+    """
+    Reads parameters of a run from its couette.xml.
+    The keys use the syntax of the ensemble generators, e.g. 'couette-test/domain/wall-velocity'.
+
+    Args:
+        folder (str): The run directory.
+        keys (Iterable[str]): The element paths and attribute names.
+
+    Returns:
+        Dict[str, Optional[str]]: The value of each key, None if the run contains no such attribute.
+    """
+    path = os.path.join(folder, COUETTE_XML)
+    root = ET.parse(path).getroot() if os.path.isfile(path) else None
+    parameters = {}
+    for key in keys:
+        element_path, attribute = key.rsplit("/", 1)
+        element = root.find(element_path) if root is not None else None
+        parameters[key] = element.attrib.get(attribute) if element is not None else None
+    return parameters
+
+
+def read_filter_outputs(folder):
+    """
+    Reads the files written by the filter pipeline of a run from its couette.xml,
+    i.e. the locations of all 'write-to-file' filters, e.g. ['raw-md.csv', 'gauss-2d.csv'].
+
+    Args:
+        folder (str): The run directory.
+
+    Returns:
+        Optional[List[str]]: The locations in the order of the pipeline, None if the run contains no couette.xml.
+    """
+    path = os.path.join(folder, COUETTE_XML)
+    if not os.path.isfile(path):
+        return None
+    root = ET.parse(path).getroot()
+    return [ element.attrib["location"] for element in root.iter("write-to-file") if "location" in element.attrib ]
@@ -0,0 +1,116 @@
+import numpy as np
+
+from typing import *
+
+########################################
+# Streaming error statistics of the filter outputs against the CFD reference.
+# The differences are consumed one coupling cycle at a time, so the memory
+# does not depend on the number of coupling cycles: per MD cell, the running
+# mean and sum of squared deviations (Welford), the sums of the squared and
+# absolute differences and the maximum absolute difference are kept.
+# Only the per-iteration curves grow, by a few values per coupling cycle.
+
+# Error metrics, evaluated on the statistics of a group of differences, see ErrorAccumulator:
+#   'n': number of differences, 'sq'/'abs': sum of squared/absolute differences,
+#   'mean': mean difference, 'm2': sum of squared deviations from the mean, 'max': maximum absolute difference
+METRICS: Dict[str, Callable[[Dict[str, np.ndarray]], np.ndarray]] = {
+    "mse":  lambda stats: stats["sq"] / stats["n"],
+    "rmse": lambda stats: np.sqrt(stats["sq"] / stats["n"]),
+    "mae":  lambda stats: stats["abs"] / stats["n"],
+    "mean": lambda stats: stats["mean"],
+    "var":  lambda stats: stats["m2"] / stats["n"],
+    "max":  lambda stats: stats["max"],
+}
+
+
+class ErrorAccumulator:
+    """
+    Accumulates the differences between several filter outputs and the CFD reference,
+    one coupling cycle (snapshot) at a time.
+    """
+
+    def __init__(self, n_filters, md_cells):
+        """
+        Args:
+            n_filters (int): The number of filter outputs.
+            md_cells (ArrayLike): The number of MD cells in x, y, z direction.
+        """
+        nx, ny, nz = md_cells
+        shape = (n_filters, nz, ny, nx)
+        self.count = 0
+        self.cell_mean = np.zeros(shape)
+        self.cell_m2 = np.zeros(shape)
+        self.cell_sq = np.zeros(shape)
+        self.cell_abs = np.zeros(shape)
+        self.cell_max = np.zeros(shape)
+        # statistics of each snapshot over all cells
+        self._time: Dict[str, List[np.ndarray]] = { key: [] for key in ("sq", "abs", "mean", "m2", "max") }
+
+    def add(self, err):
+        """
+        Adds the differences of one snapshot.
+
+        Args:
+            err (np.ndarray): The differences of shape (filter, z, y, x).
+        """
+        self.count += 1
+        delta = err - self.cell_mean
+        self.cell_mean += delta / self.count
+        self.cell_m2 += delta * (err - self.cell_mean)
+        sq, ae = np.square(err), np.abs(err)
+        self.cell_sq += sq
+        self.cell_abs += ae
+        np.maximum(self.cell_max, ae, out=self.cell_max)
+
+        axes = (1, 2, 3)
+        mean = err.mean(axis=axes)
+        self._time["sq"].append(sq.sum(axis=axes))
+        self._time["abs"].append(ae.sum(axis=axes))
+        self._time["mean"].append(mean)
+        self._time["m2"].append(np.square(err - mean[:, np.newaxis, np.newaxis, np.newaxis]).sum(axis=axes))
+        self._time["max"].append(ae.max(axis=axes))
+
+    def _group(self, axes):
+        """
+        Combines the statistics of the cells along the given axes (Chan et al.).
+        """
+        cells = int(np.prod([ self.cell_mean.shape[a] for a in axes ]))
+        mean = self.cell_mean.mean(axis=axes, keepdims=True)
+        m2 = self.cell_m2.sum(axis=axes) + self.count * np.square(self.cell_mean - mean).sum(axis=axes)
+        return {
+            "n":    self.count * cells,
+            "sq":   self.cell_sq.sum(axis=axes),
+            "abs":  self.cell_abs.sum(axis=axes),
+            "mean": mean.squeeze(axis=axes),
+            "m2":   m2,
+            "max":  self.cell_max.max(axis=axes),
+        }
+
+    def total(self):
+        """
+        Returns the statistics over all cells and snapshots, each of shape (filter,).
+        """
+        return self._group((1, 2, 3))
+
+    def z_slices(self):
+        """
+        Returns the statistics per z-slice over all snapshots, each of shape (filter, z).
+        """
+        return self._group((2, 3))
+
+    def cells(self):
+        """
+        Returns the statistics per cell over all snapshots, each of shape (filter, z, y, x).
+        """
+        return {
+            "n": self.count, "sq": self.cell_sq, "abs": self.cell_abs,
+            "mean": self.cell_mean, "m2": self.cell_m2, "max": self.cell_max,
+        }
+
+    def time(self):
+        """
+        Returns the statistics per snapshot over all cells, each of shape (filter, snapshot).
+        """
+        stats = { key: np.stack(values, axis=1) for key, values in self._time.items() }
+        stats["n"] = int(np.prod(self.cell_mean.shape[1:]))
+        return stats
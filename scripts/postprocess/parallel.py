@@ -0,0 +1,40 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+
+
+def map_runs(func, runs, workers=None):
+    """
+    Applies func to the arguments of each run in a process pool and gathers the results in order.
+    func must be a module-level function, so that it can be pickled to the worker processes.
+
+    Args:
+        func (Callable): The per-run work, e.g. reading the result files of a run.
+        runs (List[Tuple]): The arguments of func for each run.
+        workers (Optional[int]): The number of processes, all cores if None, sequential if 1.
+
+    Returns:
+        List[Any]: The result of func for each run.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(runs) <= 1:
+        return [ func(*args) for args in runs ]
+    workers = min(workers, len(runs))
+    # hand out several runs per task to keep the inter-process overhead low
+    chunksize = max(1, len(runs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, *zip(*runs), chunksize=chunksize))
+
+
+def allocated_cpus():
+    """
+    Returns the number of cores allocated to this job, i.e. $SLURM_CPUS_PER_TASK within a slurm job,
+    otherwise the number of cores this process may run on.
+    """
+    cpus = os.environ.get("SLURM_CPUS_PER_TASK", "")
+    if cpus.isdigit() and int(cpus) > 0:
+        return int(cpus)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
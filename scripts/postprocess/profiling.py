@@ -0,0 +1,154 @@
+import argparse
+import cProfile
+import json
+import os
+import resource
+import runpy
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import *
+
+########################################
+# Profiling of the reduce engine and of postprocessing scripts, enabled with 'profile=true'.
+# The wall-clock time of each phase (e.g. 'vtk_read', 'csv_read', 'metrics', 'write') is summed up
+# over all its calls and written with the peak memory to '<name>_profile.json' in the run directory:
+#     {
+#       "name": "reduce",
+#       "total": 12.3,
+#       "phases": { "vtk_read": { "seconds": 8.1, "calls": 91 }, ... },
+#       "threads": 8,
+#       "peak_rss_mb": 153.2
+#     }
+# Phases executed by several threads at once are summed over the threads,
+# so their seconds may exceed the total.
+# Optionally, the main thread is profiled with cProfile, written to '<name>_profile.prof'
+# (python3 -m pstats reduce_profile.prof).
+# The postprocessing modules time their expensive steps (e.g. 'load_run', 'index_build', 'index_query')
+# with phase(), which records them in the activated profiler of the process, see activate.
+# The module only depends on the standard library, so it can also wrap a single postprocessing script:
+#     python3 profiling.py [--cprofile] script.py [args ...]
+# The wrapper only records the walltime of the whole script (phase 'script') and the peak memory,
+# as the script imports the postprocessing modules under its own package name.
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+class Profiler:
+    """
+    Collects the wall-clock time per phase, thread-safe.
+    A disabled profiler only passes through, so it can always be used.
+    """
+
+    def __init__(self, name="reduce", enabled=True, cprofile=False):
+        """
+        Args:
+            name (str): The name of the report, '<name>_profile.json'.
+            enabled (bool): Whether the phases are timed.
+            cprofile (bool): Whether the main thread is also profiled with cProfile.
+        """
+        self.name = name
+        self.enabled = enabled
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.threads = 1
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._cprofile = cProfile.Profile() if enabled and cprofile else None
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as (part of) the given phase.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                phase = self.phases.setdefault(name, { "seconds": 0.0, "calls": 0 })
+                phase["seconds"] += seconds
+                phase["calls"] += 1
+
+    def report(self):
+        """
+        Returns the report, see above.
+        """
+        return {
+            "name": self.name,
+            "total": time.perf_counter() - self._start,
+            "phases": { name: dict(phase) for name, phase in self.phases.items() },
+            "threads": self.threads,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def write(self, folder):
+        """
+        Writes the report and the cProfile statistics to the given directory, if enabled.
+
+        Returns:
+            Optional[Dict[str, Any]]: The report, None if disabled.
+        """
+        if not self.enabled:
+            return None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(os.path.join(folder, f"{self.name}_profile.prof"))
+        report = self.report()
+        with open(os.path.join(folder, f"{self.name}_profile.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+# Profiler of the process, disabled until activate is called
+_active = Profiler(enabled=False)
+
+
+def activate(profiler):
+    """
+    Makes the given profiler record the phases of the postprocessing modules, see phase.
+
+    Args:
+        profiler (Profiler): The profiler, or a disabled one to stop recording.
+    """
+    global _active
+    _active = profiler
+
+
+def phase(name):
+    """
+    Times the enclosed block as (part of) the given phase of the activated profiler.
+    """
+    return _active.phase(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a Python script and writes its walltime and peak memory to '<name>_profile.json'")
+    parser.add_argument('--cprofile', action='store_true', help='Also profile the script with cProfile')
+    parser.add_argument('--folder', type=str, default='.', help='Directory of the report')
+    parser.add_argument('--name', type=str, default=None, help='Name of the report, default: name of the script')
+    parser.add_argument('script', type=str, help='Path to the Python script')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments of the script')
+    args = parser.parse_args()
+    profiler = Profiler(args.name or os.path.splitext(os.path.basename(args.script))[0], cprofile=args.cprofile)
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        with profiler.phase("script"):
+            runpy.run_path(args.script, run_name="__main__")
+    finally:
+        profiler.write(args.folder)
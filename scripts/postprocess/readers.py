@@ -1,29 +1,70 @@
+import io
 import os
 
 import numpy as np
 import pandas as pd
 
 from typing import *
-from vtk import *
 
+from .cache import load_or_build
+from .couette_config import COUETTE_XML, read_couette_geometry
+from .vtk_reader import read_structured_grid_cells
 
-def get_df_from_filter_csv(folder, filename):
+
+class MDWindowIndex(NamedTuple):
+    """
+    Position of the inner MD cells within the LB grid of a run.
+
+    Attributes:
+        cell_dims (Tuple[int, int, int]): Number of LB cells in x, y, z direction.
+        shape (Tuple[int, int, int]): Number of MD cells in z, y, x direction.
+        gather (np.ndarray): Flat indices of the MD cells into the LB cell arrays,
+            ordered by z, y, x.
+        idx_x (np.ndarray): The x index of each MD cell.
+        idx_y (np.ndarray): The y index of each MD cell.
+        idx_z (np.ndarray): The z index of each MD cell.
+    """
+    cell_dims: Tuple[int, int, int]
+    shape: Tuple[int, int, int]
+    gather: np.ndarray
+    idx_x: np.ndarray
+    idx_y: np.ndarray
+    idx_z: np.ndarray
+
+
+# Quantities (last axis) of the arrays returned by get_array_from_filter_csv and get_array_from_cfd_vtk
+FILTER_QUANTITIES = ["mass", "mom_x", "mom_y", "mom_z", "vel_x", "vel_y", "vel_z"]
+CFD_QUANTITIES = ["density", "vel_x", "vel_y", "vel_z"]
+
+# MD window indices per (run directory, scenario); the LB grid does not change between coupling cycles
+_md_window_indices: Dict[Tuple[str, int], MDWindowIndex] = {}
+
+
+def get_df_from_filter_csv(folder, filename, min=100, max=1000, step=10, scenario=30):
     """
     Reads the (filter output) csv file in the given folder and creates an indexed dataframe.
     Only iterations >= 100, <= 1000, and every 10th iteration are considered.
+    Rows outside of this window are skipped while reading and are never parsed.
     The dataframe is sorted by iteration and x,y,z indices.
 
     Args:
         folder (str): The folder containing the csv file.
         filename (str): The name of the csv file.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
 
     Returns:
         pd.DataFrame: The indexed dataframe.
     """
     ########################################
-    # Load the data
+    # Load the data of iterations >= 100, <= 1000, and every 10th iteration
+    rows = read_iteration_window(os.path.join(folder, filename), it_min=min, it_max=max, step=step)
+    if not rows:
+        raise ValueError(f"No iterations between {min} and {max} found in '{os.path.join(folder, filename)}'.")
     df = pd.read_csv(
-        filepath_or_buffer=os.path.join(folder, filename),
+        filepath_or_buffer=io.BytesIO(rows),
         header=None,
         delimiter=";",
         names=["iteration", "mass", "mom_x", "mom_y", "mom_z"],
@@ -31,20 +72,16 @@ def get_df_from_filter_csv(folder, filename):
         dtype={"iteration": np.int32, "mass": float, "mom_x": float, "mom_y": float, "mom_z": float},
     )
 
-    ########################################
-    # Filter iterations >= 100, <= 1000, and every 10th iteration
-    df = df[(df["iteration"] >= 100) & (df["iteration"] <= 1000) & (df["iteration"] % 10 == 0)]
-
     ########################################
     # Extract scenario values
     iterations = len(df["iteration"].unique())
-    cells_in_each_dim = 6
+    nx, ny, nz = read_couette_geometry(folder, scenario).md_cells
 
     ########################################
     # Add the indices for each iteration
-    ix = np.tile(np.arange(0, cells_in_each_dim), cells_in_each_dim ** 2)
-    iy = np.tile(np.repeat(np.arange(0, cells_in_each_dim), cells_in_each_dim), cells_in_each_dim)
-    iz = np.repeat(np.arange(0, cells_in_each_dim), cells_in_each_dim ** 2)
+    ix = np.tile(np.arange(0, nx), ny * nz)
+    iy = np.tile(np.repeat(np.arange(0, ny), nx), nz)
+    iz = np.repeat(np.arange(0, nz), nx * ny)
     # populate the dataframe with indices for each iteration
     df["idx_x"] = np.tile(ix, iterations)
     df["idx_y"] = np.tile(iy, iterations)
@@ -61,16 +98,76 @@ def get_df_from_filter_csv(folder, filename):
     return df
 
 
-def get_df_from_cfd_vtk(folder, length, scenario=30):
+def read_iteration_window(path, it_min=100, it_max=1000, step=10, chunk_size=1 << 20):
+    """
+    Reads the raw rows of every step-th iteration between it_min and it_max from a (filter output) csv file.
+    MaMiCo writes the rows of each coupling cycle as one contiguous block in ascending order,
+    so the file is scanned chunk-wise for the blocks of the wanted iterations only,
+    and reading stops as soon as an iteration beyond it_max is reached.
+
+    Args:
+        path (str): The path to the csv file.
+        it_min (int): The first iteration to consider.
+        it_max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+        chunk_size (int): The number of bytes to read at once.
+
+    Returns:
+        bytes: The rows of the wanted iterations, in file order.
+    """
+    blocks = []
+    rest = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            # only process complete lines, keep the rest for the next chunk
+            data = rest + chunk
+            cut = data.rfind(b"\n") + 1 if chunk else len(data)
+            data, rest = b"\n" + data[:cut], data[cut:]
+            if data.rfind(b";") < 0:
+                if not chunk:
+                    break
+                continue
+            if not data.endswith(b"\n"):
+                data += b"\n"
+
+            # first and last iteration in this chunk
+            first = int(data[1:data.index(b";")])
+            last_line = data.rfind(b"\n", 0, data.rfind(b";")) + 1
+            last = int(data[last_line:data.index(b";", last_line)])
+
+            # collect the blocks of the wanted iterations
+            start_it = first if first > it_min else it_min
+            start_it += -start_it % step
+            cursor = 0
+            for iteration in range(start_it, min(last, it_max) + 1, step):
+                prefix = b"\n%d;" % iteration
+                start = data.find(prefix, cursor)
+                if start < 0:
+                    continue
+                # the block ends with the last row of this iteration, which is located before the next wanted one
+                upper = data.find(b"\n%d;" % (iteration + step), start)
+                upper = len(data) if upper < 0 else upper
+                end = data.find(b"\n", data.rfind(prefix, start, upper) + 1)
+                blocks.append(data[start + 1:end + 1])
+                cursor = end
+
+            if last > it_max or not chunk:
+                break
+
+    return b"".join(blocks)
+
+
+def get_df_from_cfd_vtk(folder, scenario=30):
     """
     Reads the vtk files in the given folder and creates an indexed dataframe.
     Only iterations >= 100, <= 1000, and every 10th iteration are considered.
     The dataframe is sorted by iteration and x,y,z indices.
+    It has one row per MD cell of the window derived from the couette.xml and per vtk file.
 
     Args:
         folder (str): The folder containing the vtk files.
-        shape (Tuple[int, int]): The shape of the final numpy array.
-        scenario (int): The scenario number.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
 
     Returns:
         pd.DataFrame: The indexed dataframe.
@@ -78,8 +175,8 @@ def get_df_from_cfd_vtk(folder, length, scenario=30):
 
     ########################################
     # Set factor to convert from vtk units
-    # to mamico units
-    factor = 10
+    # to mamico units, derived from the couette.xml of the run
+    factor = read_couette_geometry(folder, scenario).velocity_factor
     # explanation:
     # MD30: dt_md = 0.005                \
     #       dt_lb = dt_md * n_time_steps |
@@ -93,13 +190,6 @@ def get_df_from_cfd_vtk(folder, length, scenario=30):
     #             = 0.5                  |
     #       dx_lb = 5.0                  /
 
-    ########################################
-    # Create an empty numpy array
-    numpy_array = np.zeros((length,8)) # it, dens, v_x, v_y, v_z, idx_x, idx_y, idx_z
-
-    # Row counter for final result-array
-    row = 0
-
     ########################################
     # Find and sort the vtk files
     vtk_files = [f for f in os.listdir(folder) if f.endswith(".vtk")]
@@ -108,48 +198,34 @@ def get_df_from_cfd_vtk(folder, length, scenario=30):
     iteration = lambda f: int(f.split("_")[2][1:-4])
     vtk_files = [(iteration(f), f) for f in vtk_files if iteration(f) >= 100 and iteration(f) <= 1000]
 
+    # The array is created once the size of the MD window is known from the first vtk file
+    numpy_array = np.zeros((0, 8)) # it, dens, v_x, v_y, v_z, idx_x, idx_y, idx_z
+
+    # Row counter for final result-array
+    row = 0
+
     ########################################
     # Iterate over the vtk files and extract the data
     for i, f in sorted(vtk_files):
-        index = i // 10 - 10
-        reader : vtkStructuredGridReader = vtkStructuredGridReader()
-        reader.SetFileName(os.path.join(folder, f))
-        reader.ReadAllScalarsOn()
-        reader.Update()
-
-        # Get the structured grid
-        grid : vtkStructuredGrid = reader.GetOutput()
-
-        # Get the dimensions of the grid
-        dims = [-1, -1, -1]
-        grid.GetDimensions(dims)
-
-        # Get the number of cells
-        n_cells = grid.GetNumberOfCells()
-
-        # Set the number of MD cells and the offsets
-        md_cells = [6, 6, 6]
-        md_cell_offsets = [8, 8, 5]
-
-        # Get the density and velocity arrays
-        densities  : vtkDataArray = grid.GetCellData().GetScalars("density")
-        velocities : vtkDataArray = grid.GetCellData().GetVectors("velocity")
-
-        # Get the indices of the MD cell
-        min_x, max_x = md_cell_offsets[0], md_cell_offsets[0] + md_cells[0] - 1
-        min_y, max_y = md_cell_offsets[1], md_cell_offsets[1] + md_cells[1] - 1
-        min_z, max_z = md_cell_offsets[2], md_cell_offsets[2] + md_cells[2] - 1
-
-        offset = 2.5 if scenario == 30 else 5
-
-        # Iterate over inner MD cells (6x6x6)
-        for cell in range(n_cells):
-            pos = ((np.array(grid.GetCell(cell).GetBounds()) + offset) / offset).astype(int)[::2]
-            if min_x <= pos[0] <= max_x and min_y <= pos[1] <= max_y and min_z <= pos[2] <= max_z:
-                # print(f"Cell {cell}: {n} - {list(densities.GetTuple(cell)) + list(velocities.GetTuple(cell))}")
-                numpy_array[row] = [i] + list(densities.GetTuple(cell)) + list(velocities.GetTuple(cell)) + [pos[0] - min_x, pos[1] - min_y, pos[2] - min_z]
-                row += 1
-        # row should be 216 (6x6x6)
+        # Read the dimensions, the origin and the cell arrays of the structured grid
+        grid = read_structured_grid_cells(os.path.join(folder, f), names=("density", "velocity"))
+
+        # Get the (cached) positions of the MD cells within the LB grid
+        window = get_md_window_index(folder, grid, scenario)
+        n_md_cells = window.gather.size
+        if row == 0:
+            numpy_array = np.zeros((len(vtk_files) * n_md_cells, 8))
+        elif row + n_md_cells > numpy_array.shape[0]:
+            raise ValueError(f"The MD window of '{f}' has {n_md_cells} cells, unlike the earlier vtk files in '{folder}'.")
+
+        block = numpy_array[row:row + n_md_cells]
+        block[:, 0] = i
+        block[:, 1] = grid.cell_data["density"].reshape(-1)[window.gather]
+        block[:, 2:5] = grid.cell_data["velocity"].reshape(-1, 3)[window.gather]
+        block[:, 5] = window.idx_x
+        block[:, 6] = window.idx_y
+        block[:, 7] = window.idx_z
+        row += n_md_cells
 
     df = pd.DataFrame(
         numpy_array,
@@ -165,6 +241,213 @@ def get_df_from_cfd_vtk(folder, length, scenario=30):
     return df
 
 
+def get_array_from_filter_csv(folder, filename, min=100, max=1000, step=10, scenario=30, cache=True):
+    """
+    Reads the (filter output) csv file in the given folder into a contiguous array.
+    Only iterations >= 100, <= 1000, and every 10th iteration are considered.
+    MaMiCo writes the cells of each iteration with x running fastest and z slowest,
+    so the rows are reshaped without sorting or index columns.
+    The array is served from the cache of the run as long as the csv file is unchanged.
+
+    Args:
+        folder (str): The folder containing the csv file.
+        filename (str): The name of the csv file.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
+        cache (bool): Whether to use the cache of the run.
+
+    Returns:
+        np.ndarray: The array of shape (iterations, z, y, x, quantity), see FILTER_QUANTITIES.
+    """
+    path = os.path.join(folder, filename)
+    md_cells = read_couette_geometry(folder, scenario).md_cells
+    build = lambda: _parse_filter_csv(path, min, max, step, md_cells)
+    if not cache:
+        return build()
+    name = f"{os.path.splitext(filename)[0]}_{min}-{max}-{step}"
+    return load_or_build(folder, name, [path] + _couette_xml(folder), FILTER_QUANTITIES, build)
+
+
+def _couette_xml(folder):
+    """
+    Returns the couette.xml of the run as additional cache source, if present.
+    """
+    path = os.path.join(folder, COUETTE_XML)
+    return [path] if os.path.isfile(path) else []
+
+
+def _parse_filter_csv(path, min, max, step, md_cells):
+    """
+    Parses the (filter output) csv file into an array, see get_array_from_filter_csv.
+    """
+    rows = read_iteration_window(path, it_min=min, it_max=max, step=step)
+    if not rows:
+        raise ValueError(f"No iterations between {min} and {max} found in '{path}'.")
+    values = pd.read_csv(
+        filepath_or_buffer=io.BytesIO(rows),
+        header=None,
+        delimiter=";",
+        usecols=[1, 2, 3, 4],
+        dtype=float,
+    ).to_numpy()
+    return filter_rows_to_array(values, md_cells)
+
+
+def filter_rows_to_array(values, md_cells):
+    """
+    Converts the rows (mass, mom_x, mom_y, mom_z) of complete iterations of a filter output to an array.
+
+    Args:
+        values (np.ndarray): The rows of shape (iterations * cells, 4), x running fastest and z slowest.
+        md_cells (ArrayLike): The number of MD cells in x, y, z direction.
+
+    Returns:
+        np.ndarray: The array of shape (iterations, z, y, x, quantity), see FILTER_QUANTITIES.
+    """
+    nx, ny, nz = md_cells
+    data = np.empty((values.shape[0] // (nx * ny * nz), nz, ny, nx, len(FILTER_QUANTITIES)))
+    data[..., 0:4] = values.reshape(data.shape[:4] + (4,))
+    data[..., 4:7] = data[..., 1:4] / data[..., 0:1]
+    return data
+
+
+def get_array_from_cfd_vtk(folder, scenario=30, min=100, max=1000, step=10, cache=True):
+    """
+    Reads the vtk files in the given folder into a contiguous array.
+    Only iterations >= 100, <= 1000, and every 10th iteration are considered.
+    The velocities are converted to MaMiCo units.
+    The array is served from the cache of the run as long as the set of vtk files is unchanged.
+
+    Args:
+        folder (str): The folder containing the vtk files.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+        cache (bool): Whether to use the cache of the run.
+
+    Returns:
+        np.ndarray: The array of shape (iterations, z, y, x, quantity), see CFD_QUANTITIES.
+    """
+    vtk_files = find_vtk_files(folder, min, max, step)
+    build = lambda: _parse_cfd_vtk(folder, vtk_files, scenario, min, max)
+    if not cache:
+        return build()
+    name = f"cfd_MD{scenario}_{min}-{max}-{step}"
+    sources = [os.path.join(folder, f) for _, f in vtk_files] + _couette_xml(folder)
+    return load_or_build(folder, name, sources, CFD_QUANTITIES, build)
+
+
+def _parse_cfd_vtk(folder, vtk_files, scenario, min, max):
+    """
+    Parses the given vtk files into an array, see get_array_from_cfd_vtk.
+    """
+    data = None
+    for k, (_, f) in enumerate(vtk_files):
+        frame = read_cfd_vtk_file(folder, f, scenario)
+        if data is None:
+            data = np.empty((len(vtk_files),) + frame.shape)
+        data[k] = frame
+    if data is None:
+        raise ValueError(f"No vtk files between {min} and {max} found in '{folder}'.")
+    return data
+
+
+def read_cfd_vtk_file(folder, filename, scenario=30):
+    """
+    Reads the MD window of a single vtk file, the velocities are converted to MaMiCo units.
+
+    Args:
+        folder (str): The folder containing the vtk file.
+        filename (str): The name of the vtk file.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
+
+    Returns:
+        np.ndarray: The array of shape (z, y, x, quantity), see CFD_QUANTITIES.
+    """
+    # Set factor to convert from vtk units to mamico units, see get_df_from_cfd_vtk
+    factor = read_couette_geometry(folder, scenario).velocity_factor
+
+    grid = read_structured_grid_cells(os.path.join(folder, filename), names=("density", "velocity"))
+    window = get_md_window_index(folder, grid, scenario)
+    data = np.empty(window.shape + (len(CFD_QUANTITIES),))
+    data[..., 0] = grid.cell_data["density"].reshape(-1)[window.gather].reshape(window.shape)
+    data[..., 1:4] = grid.cell_data["velocity"].reshape(-1, 3)[window.gather].reshape(window.shape + (3,))
+    data[..., 1:4] *= factor
+    return data
+
+
+def find_vtk_files(folder, min=100, max=1000, step=10):
+    """
+    Finds the vtk files (e.g. 'LBCouette_r0_c1000.vtk') of every step-th iteration between min and max.
+
+    Args:
+        folder (str): The folder containing the vtk files.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+
+    Returns:
+        List[Tuple[int, str]]: The sorted list of (iteration, filename).
+    """
+    iteration = lambda f: int(f.split("_")[2][1:-4])
+    vtk_files = [(iteration(f), f) for f in os.listdir(folder) if f.endswith(".vtk")]
+    return sorted((i, f) for i, f in vtk_files if min <= i <= max and i % step == 0)
+
+
+def get_md_window_index(folder, grid, scenario=30):
+    """
+    Returns the position of the inner MD cells within the LB grid of a run.
+    The index is computed from the first grid read for a run directory and reused for all later files.
+
+    Args:
+        folder (str): The run directory containing the vtk files.
+        grid (StructuredGridCells): A grid read from the run directory.
+        scenario (int): The scenario number, used if the folder contains no couette.xml.
+
+    Returns:
+        MDWindowIndex: The gather index and the x,y,z indices of the MD cells.
+    """
+    key = (os.path.abspath(folder), scenario)
+    cell_dims = tuple(d - 1 for d in grid.dimensions)
+    window = _md_window_indices.get(key)
+    if window is not None and window.cell_dims == cell_dims:
+        return window
+
+    # Get the number of MD cells and the offsets from the couette.xml of the run
+    geometry = read_couette_geometry(folder, scenario)
+
+    # Get the indices of the MD cell
+    min_x, min_y, min_z = geometry.md_cell_offsets
+    max_x, max_y, max_z = geometry.md_cell_offsets + geometry.md_cells - 1
+
+    # Compute the cell positions along each axis from the lower cell corners
+    offset_x, offset_y, offset_z = geometry.cell_size
+    pos_x = ((grid.origin[0] + np.arange(cell_dims[0]) * offset_x + offset_x) / offset_x).astype(int)
+    pos_y = ((grid.origin[1] + np.arange(cell_dims[1]) * offset_y + offset_y) / offset_y).astype(int)
+    pos_z = ((grid.origin[2] + np.arange(cell_dims[2]) * offset_z + offset_z) / offset_z).astype(int)
+
+    # Select the inner MD cells by structured-grid index slicing
+    sel_x = np.flatnonzero((min_x <= pos_x) & (pos_x <= max_x))
+    sel_y = np.flatnonzero((min_y <= pos_y) & (pos_y <= max_y))
+    sel_z = np.flatnonzero((min_z <= pos_z) & (pos_z <= max_z))
+    sel_z, sel_y, sel_x = np.meshgrid(sel_z, sel_y, sel_x, indexing="ij")
+    gather = np.ravel_multi_index((sel_z.ravel(), sel_y.ravel(), sel_x.ravel()), cell_dims[::-1])
+
+    window = MDWindowIndex(
+        cell_dims=cell_dims,
+        shape=sel_x.shape,
+        gather=gather,
+        idx_x=pos_x[sel_x.ravel()] - min_x,
+        idx_y=pos_y[sel_y.ravel()] - min_y,
+        idx_z=pos_z[sel_z.ravel()] - min_z,
+    )
+    _md_window_indices[key] = window
+    return window
+
+
 def get_hsq_and_sigmasq_from_output_file(path):
     with open(path, "r") as f:
         lines = f.readlines()
@@ -173,4 +456,4 @@ def get_hsq_and_sigmasq_from_output_file(path):
     sigsq = vs[1, np.where(vs[0] == "sigsq")].astype(float)
     hsq = vs[1, np.where(vs[0] == "hsq")].astype(float)
 
-    return sigsq[0], hsq[0]
\ No newline at end of file
+    return sigsq[0], hsq[0]
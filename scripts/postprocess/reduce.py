@@ -0,0 +1,479 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import yaml
+
+from typing import *
+
+from .couette_config import read_couette_geometry, read_couette_parameters
+from .metrics import METRICS, ErrorAccumulator
+from .parallel import allocated_cpus
+from .profiling import Profiler
+from .readers import CFD_QUANTITIES, FILTER_QUANTITIES, filter_rows_to_array, find_vtk_files, read_cfd_vtk_file
+from .retention import apply_retention, validate_retention
+from .summary import write_summary
+
+########################################
+# Reduce engine for the runs of an ensemble.
+# It is executed within each run directory (e.g. by the 'run_and_reduce' template) as
+#     python3 -m postprocess.reduce reduce.yml --scenario=30
+# and computes the metrics declared in reduce.yml, e.g.
+#     metrics:
+#       - filter: 0_raw-md.csv
+#         output: res_raw.diff
+# Every coupling cycle is read once, as soon as its vtk file and the csv rows of all
+# filter outputs are complete, and added to streaming error statistics (see metrics.py),
+# so the memory does not grow with the length of the simulation.
+# All results, their z-slice, cell and time profiles and the run metadata
+# are written to one summary per run, see summary.py.
+# The csv outputs and the vtk series are parsed concurrently by a thread pool,
+# sized to the cores of the job ($SLURM_CPUS_PER_TASK).
+# With --follow, the engine runs alongside the simulation and reduces every
+# iteration as soon as it has been written, until the simulation writes its exit status to the done file.
+# A run is complete if every iteration of the window has been reduced and the simulation exited with 0,
+# otherwise the summary is marked incomplete and the engine exits with a non-zero status.
+# Once the results of a complete run are written, the optional 'retention' section of reduce.yml
+# decides what happens to the raw outputs and checkpoints, see retention.py.
+# With --profile, the time of each phase and the peak memory are written to
+# 'reduce_profile.json' in the run directory, see profiling.py.
+
+# Defaults of the optional keys of reduce.yml and of each metric
+DEFAULT_WINDOW = { "min": 100, "max": 1000, "step": 10 }
+DEFAULT_METRIC = { "metric": "mse", "quantity": "vel_x" }
+
+
+def load_reduce_config(path):
+    """
+    Loads and validates a reduce.yml file.
+
+    Args:
+        path (str): The path to the reduce.yml file.
+
+    Returns:
+        Dict[str, Any]: The configuration with the window, the completed list of metrics,
+            the run parameters to record and the retention policy.
+    """
+    with open(path, "r") as f:
+        config = yaml.safe_load(f) or {}
+
+    window = { **DEFAULT_WINDOW, **config.get("window", {}) }
+    metrics = [ { **DEFAULT_METRIC, **m } for m in config.get("metrics", []) ]
+    parameters = list(config.get("parameters", []))
+    if not metrics:
+        raise ValueError(f"No metrics defined in '{path}'.")
+    for m in metrics:
+        if "filter" not in m or "output" not in m:
+            raise ValueError(f"Each metric in '{path}' needs a 'filter' and an 'output', got {m}.")
+        if m["metric"] not in METRICS:
+            raise ValueError(f"Unknown metric '{m['metric']}' in '{path}', choose from {list(METRICS)}.")
+        if m["quantity"] not in CFD_QUANTITIES or m["quantity"] not in FILTER_QUANTITIES:
+            raise ValueError(f"Quantity '{m['quantity']}' in '{path}' is not available for both CFD and filter outputs.")
+    retention = validate_retention(config.get("retention"))
+    return { "window": window, "metrics": metrics, "parameters": parameters, "retention": retention }
+
+
+def evaluate_metrics(metrics, filters, accumulators):
+    """
+    Evaluates the declared metrics over all cells and iterations.
+
+    Args:
+        metrics (List[Dict[str, Any]]): The metrics, see load_reduce_config.
+        filters (List[str]): The filter outputs, in the order of the accumulators.
+        accumulators (Dict[str, ErrorAccumulator]): The error statistics per quantity.
+
+    Returns:
+        Dict[str, float]: The value of each output.
+    """
+    totals = { quantity: acc.total() for quantity, acc in accumulators.items() }
+    return {
+        m["output"]: float(METRICS[m["metric"]](totals[m["quantity"]])[filters.index(m["filter"])])
+        for m in metrics
+    }
+
+
+def evaluate_profiles(metrics, filters, accumulators):
+    """
+    Evaluates the declared metrics per z-slice, per cell and per iteration.
+
+    Args:
+        metrics (List[Dict[str, Any]]): The metrics, see load_reduce_config.
+        filters (List[str]): The filter outputs, in the order of the accumulators.
+        accumulators (Dict[str, ErrorAccumulator]): The error statistics per quantity.
+
+    Returns:
+        Dict[str, Dict[str, np.ndarray]]: The profiles of each output.
+    """
+    stats = {
+        quantity: { "z_profile": acc.z_slices(), "cell_profile": acc.cells(), "time": acc.time() }
+        for quantity, acc in accumulators.items()
+    }
+    return {
+        m["output"]: {
+            key: METRICS[m["metric"]](s)[filters.index(m["filter"])]
+            for key, s in stats[m["quantity"]].items()
+        }
+        for m in metrics
+    }
+
+
+def window_iterations(window):
+    """
+    Returns all iterations of the window, i.e. every step-th iteration between min and max.
+    """
+    return list(range(-(-window["min"] // window["step"]) * window["step"], window["max"] + 1, window["step"]))
+
+
+def read_exit_status(path):
+    """
+    Reads the exit status of the simulation from the done file.
+
+    Args:
+        path (str): The path to the done file.
+
+    Returns:
+        Optional[int]: The exit status, None if the done file does not contain one (e.g. created by 'touch').
+    """
+    with open(path, "r") as f:
+        content = f.read().strip()
+    return int(content) if content else None
+
+
+def write_results(folder, config, scenario, filters, accumulators, iterations, walltime, skipped=(), exit_status=None):
+    """
+    Writes the summary of a reduced run, see summary.py.
+    The run is complete if all iterations of the window have been reduced and the simulation did not fail.
+
+    Args:
+        folder (str): The run directory.
+        config (Dict[str, Any]): The configuration, see load_reduce_config.
+        scenario (int): The scenario number, used if the run contains no couette.xml.
+        filters (List[str]): The filter outputs, in the order of the accumulators.
+        accumulators (Dict[str, ErrorAccumulator]): The error statistics per quantity.
+        iterations (List[int]): The reduced iterations, in the order they were accumulated.
+        walltime (Dict[str, Optional[float]]): The walltime of the simulation and of the reduction in seconds.
+        skipped (Iterable[int]): The iterations of the window whose vtk file could not be read.
+        exit_status (Optional[int]): The exit status of the simulation, None if unknown.
+
+    Returns:
+        Dict[str, Any]: The summary.
+    """
+    metrics = config["metrics"]
+    results = evaluate_metrics(metrics, filters, accumulators)
+    profiles = evaluate_profiles(metrics, filters, accumulators)
+    skipped = sorted(int(i) for i in skipped)
+    reduced = set(int(i) for i in iterations)
+    missing = [ i for i in window_iterations(config["window"]) if i not in reduced and i not in skipped ]
+    summary = {
+        "run": os.path.basename(os.path.abspath(folder)),
+        "scenario": scenario,
+        "md_cells": read_couette_geometry(folder, scenario).md_cells.tolist(),
+        "window": config["window"],
+        "iterations": [ int(i) for i in iterations ],
+        "skipped": skipped,
+        "missing": missing,
+        "exit_status": exit_status,
+        "complete": not skipped and not missing and exit_status in (0, None),
+        "parameters": read_couette_parameters(folder, config["parameters"]),
+        "walltime": walltime,
+        "metrics": {
+            m["output"]: {
+                "filter": m["filter"],
+                "metric": m["metric"],
+                "quantity": m["quantity"],
+                "value": results[m["output"]],
+                **{ key: profile.tolist() for key, profile in profiles[m["output"]].items() },
+            }
+            for m in metrics
+        },
+    }
+    write_summary(folder, summary)
+    return summary
+
+
+def reduce_run(folder, config, scenario=30, workers=None, profiler=None):
+    """
+    Computes the metrics of a run and writes them to the summary of the run.
+
+    Args:
+        folder (str): The run directory.
+        config (Dict[str, Any]): The configuration, see load_reduce_config.
+        scenario (int): The scenario number, used if the run contains no couette.xml.
+        workers (Optional[int]): The number of threads parsing the outputs, all allocated cores if None.
+        profiler (Optional[Profiler]): Times the phases of the reduction, see profiling.py.
+
+    Returns:
+        Dict[str, Any]: The summary, see write_results.
+    """
+    start = time.perf_counter()
+    reducer = IncrementalReducer(folder, config, scenario, workers=workers, profiler=profiler)
+    try:
+        reducer.poll(final=True)
+    finally:
+        reducer.close()
+    return reducer.write_results({ "simulation": None, "reduce": time.perf_counter() - start })
+
+
+class IncrementalReducer:
+    """
+    Reduces a run, also while the simulation is still writing its outputs.
+    The csv rows are parsed once, chunk by chunk, and every iteration is added to
+    the error statistics as soon as its vtk file and the rows of all filter outputs are complete.
+    Only the rows of iterations that are not complete yet are kept in memory.
+    The next chunk of each filter output and the upcoming vtk files are parsed concurrently.
+    """
+
+    def __init__(self, folder, config, scenario=30, chunk_size=1 << 22, workers=None, profiler=None):
+        """
+        Args:
+            folder (str): The run directory.
+            config (Dict[str, Any]): The configuration, see load_reduce_config.
+            scenario (int): The scenario number, used if the run contains no couette.xml.
+            chunk_size (int): The maximum number of bytes read from a filter output at once.
+            workers (Optional[int]): The number of threads parsing the outputs, all allocated cores if None.
+            profiler (Optional[Profiler]): Times the phases 'csv_read', 'vtk_read', 'metrics' and 'write', see profiling.py.
+        """
+        self.folder = folder
+        self.config = config
+        self.scenario = scenario
+        self.chunk_size = chunk_size
+        self.window = config["window"]
+        self.metrics = config["metrics"]
+        self.filters = list(dict.fromkeys(m["filter"] for m in self.metrics))
+        self.quantities = list(dict.fromkeys(m["quantity"] for m in self.metrics))
+        self.md_cells = read_couette_geometry(folder, scenario).md_cells
+        self.n_cells = int(np.prod(self.md_cells))
+        # read position and incomplete last line per filter output
+        self._offsets = { f: 0 for f in self.filters }
+        self._rest = { f: b"" for f in self.filters }
+        # rows of the wanted iterations that are not reduced yet, per filter output
+        self._pending: Dict[str, Dict[int, List[np.ndarray]]] = { f: {} for f in self.filters }
+        self._reduced: Set[int] = set()
+        # iterations in the order they were accumulated
+        self.iterations: List[int] = []
+        # iterations whose vtk file could not be read after the simulation finished
+        self.skipped: List[int] = []
+        self.accumulators = { q: ErrorAccumulator(len(self.filters), self.md_cells) for q in self.quantities }
+        self.workers = workers or allocated_cpus()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.profiler = profiler or Profiler(enabled=False)
+        self.profiler.threads = self.workers
+        # vtk files being parsed ahead of their csv rows, per iteration
+        self._cfd: Dict[int, Future] = {}
+
+    def close(self):
+        """
+        Shuts down the threads parsing the outputs.
+        """
+        self._executor.shutdown(wait=True)
+        self._cfd.clear()
+
+    def _wanted(self, iterations):
+        w = self.window
+        return (iterations >= w["min"]) & (iterations <= w["max"]) & (iterations % w["step"] == 0)
+
+    def _read_new_rows(self, filename):
+        """
+        Parses the next chunk of rows appended to a filter output.
+
+        Returns:
+            int: The number of bytes read.
+        """
+        with self.profiler.phase("csv_read"):
+            return self._parse_new_rows(filename)
+
+    def _parse_new_rows(self, filename):
+        path = os.path.join(self.folder, filename)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            f.seek(self._offsets[filename])
+            data = f.read(self.chunk_size)
+        self._offsets[filename] += len(data)
+        read = len(data)
+        data = self._rest[filename] + data
+        cut = data.rfind(b"\n") + 1
+        data, self._rest[filename] = data[:cut], data[cut:]
+        if not data.strip():
+            return read
+        rows = pd.read_csv(io.BytesIO(data), header=None, delimiter=";", usecols=[0, 1, 2, 3, 4], dtype=float).to_numpy()
+        iterations = rows[:, 0].astype(int)
+        wanted = self._wanted(iterations)
+        for iteration in np.unique(iterations[wanted]):
+            if iteration not in self._reduced:
+                self._pending[filename].setdefault(int(iteration), []).append(rows[iterations == iteration, 1:5])
+        return read
+
+    def _read_vtk(self, vtk_file):
+        with self.profiler.phase("vtk_read"):
+            return read_cfd_vtk_file(self.folder, vtk_file, self.scenario)
+
+    def _complete(self, filename, iteration):
+        return sum(len(r) for r in self._pending[filename].get(iteration, [])) == self.n_cells
+
+    def _prefetch_vtk(self, vtk_files, final):
+        """
+        Starts parsing the next vtk files that are not reduced yet, at most two per thread.
+        While the simulation is running, the newest vtk file may still be written and is not prefetched.
+        """
+        if not final:
+            vtk_files = vtk_files[:-1]
+        for iteration, vtk_file in vtk_files:
+            if len(self._cfd) >= 2 * self.workers:
+                break
+            if iteration not in self._reduced and iteration not in self._cfd:
+                self._cfd[iteration] = self._executor.submit(self._read_vtk, vtk_file)
+
+    def _reduce_complete(self, vtk_files, final):
+        """
+        Adds all complete iterations to the error statistics.
+
+        Returns:
+            int: The number of newly reduced iterations.
+        """
+        reduced = 0
+        newest = vtk_files[-1][0] if vtk_files else None
+        for iteration, vtk_file in vtk_files:
+            if iteration in self._reduced or not all(self._complete(f, iteration) for f in self.filters):
+                continue
+            future = self._cfd.pop(iteration, None)
+            if future is None and iteration == newest and not final:
+                # the newest vtk file may still be written, see _prefetch_vtk
+                continue
+            try:
+                if future is not None:
+                    cfd = future.result()
+                else:
+                    cfd = self._read_vtk(vtk_file)
+            except (ValueError, KeyError):
+                if final:
+                    # the simulation has finished, the vtk file will not be completed anymore
+                    print(f"WARNING: Skipping unreadable vtk file '{vtk_file}', recorded in the summary.")
+                    self.skipped.append(iteration)
+                    self._reduced.add(iteration)
+                    for f in self.filters:
+                        self._pending[f].pop(iteration, None)
+                continue
+            with self.profiler.phase("metrics"):
+                # shape (filter, z, y, x, quantity)
+                md = np.concatenate([
+                    filter_rows_to_array(np.concatenate(self._pending[f].pop(iteration)), self.md_cells)
+                    for f in self.filters
+                ])
+                for quantity, acc in self.accumulators.items():
+                    acc.add(md[..., FILTER_QUANTITIES.index(quantity)] - cfd[np.newaxis, ..., CFD_QUANTITIES.index(quantity)])
+            self.iterations.append(iteration)
+            self._reduced.add(iteration)
+            reduced += 1
+        return reduced
+
+    def poll(self, final=False):
+        """
+        Reads the new outputs chunk by chunk and reduces all iterations that are complete.
+
+        Args:
+            final (bool): Whether the simulation has finished, i.e. unreadable vtk files will not change anymore.
+
+        Returns:
+            int: The number of newly reduced iterations.
+        """
+        w = self.window
+        reduced = 0
+        while True:
+            reads = [ self._executor.submit(self._read_new_rows, f) for f in self.filters ]
+            vtk_files = find_vtk_files(self.folder, w["min"], w["max"], w["step"])
+            self._prefetch_vtk(vtk_files, final)
+            read = sum(r.result() for r in reads)
+            reduced += self._reduce_complete(vtk_files, final)
+            if read == 0:
+                return reduced
+
+    def write_results(self, walltime, exit_status=None):
+        """
+        Writes the summary of the iterations reduced so far, see write_results.
+        """
+        if not self.iterations:
+            raise ValueError(f"No complete iterations found in '{self.folder}'.")
+        with self.profiler.phase("write"):
+            return write_results(
+                self.folder, self.config, self.scenario, self.filters, self.accumulators,
+                self.iterations, walltime, self.skipped, exit_status,
+            )
+
+
+def follow_run(folder, config, scenario=30, done_file="couette.done", poll_interval=2.0, workers=None, profiler=None):
+    """
+    Reduces a run alongside the simulation, until the done file appears and all outputs are reduced.
+
+    Args:
+        folder (str): The run directory.
+        config (Dict[str, Any]): The configuration, see load_reduce_config.
+        scenario (int): The scenario number, used if the run contains no couette.xml.
+        done_file (str): The file created once the simulation has finished, containing its exit status.
+        poll_interval (float): The number of seconds to wait for new outputs.
+        workers (Optional[int]): The number of threads parsing the outputs, all allocated cores if None.
+        profiler (Optional[Profiler]): Times the phases of the reduction and the waiting for new outputs ('wait'), see profiling.py.
+
+    Returns:
+        Dict[str, Any]: The summary, see write_results.
+    """
+    start, start_time = time.perf_counter(), time.time()
+    reducer = IncrementalReducer(folder, config, scenario, workers=workers, profiler=profiler)
+    try:
+        while True:
+            # check before polling, so that the outputs are read completely after the simulation finished
+            done = os.path.exists(os.path.join(folder, done_file))
+            if reducer.poll(final=done) == 0:
+                if done:
+                    break
+                with reducer.profiler.phase("wait"):
+                    time.sleep(poll_interval)
+    finally:
+        reducer.close()
+    # the reducer is started together with the simulation, which creates the done file when it has finished
+    walltime = {
+        "simulation": os.path.getmtime(os.path.join(folder, done_file)) - start_time,
+        "reduce": time.perf_counter() - start,
+    }
+    return reducer.write_results(walltime, read_exit_status(os.path.join(folder, done_file)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('config', type=str, nargs='?', default='reduce.yml', help='Path to the reduce.yml file')
+    parser.add_argument('--scenario', type=int, default=30, help='Scenario number, used if the run contains no couette.xml')
+    parser.add_argument('--folder', type=str, default='.', help='Run directory')
+    parser.add_argument('--follow', action='store_true', help='Reduce alongside the simulation until the done file appears')
+    parser.add_argument('--done-file', type=str, default='couette.done', help='File created once the simulation has finished')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait for new outputs in follow mode')
+    parser.add_argument('--workers', type=int, default=None, help='Threads parsing the outputs, default: $SLURM_CPUS_PER_TASK or all cores')
+    parser.add_argument('--profile', action='store_true', help='Write the time per phase and the peak memory to reduce_profile.json')
+    parser.add_argument('--cprofile', action='store_true', help='With --profile, also write cProfile statistics to reduce_profile.prof')
+    args = parser.parse_args()
+    print(f"Calculating differences for {os.path.basename(os.path.abspath(args.folder))}")
+    profiler = Profiler("reduce", enabled=args.profile, cprofile=args.cprofile)
+    config = load_reduce_config(args.config)
+    if args.follow:
+        summary = follow_run(args.folder, config, scenario=args.scenario, done_file=args.done_file, poll_interval=args.poll_interval, workers=args.workers, profiler=profiler)
+    else:
+        summary = reduce_run(args.folder, config, scenario=args.scenario, workers=args.workers, profiler=profiler)
+    # the raw outputs of incomplete runs are kept, so that they can be inspected and reduced again
+    if summary["complete"]:
+        with profiler.phase("retention"):
+            removed = apply_retention(args.folder, config["retention"])
+        if removed:
+            print(f"Removed {removed} files according to the retention policy.")
+    else:
+        print(
+            f"ERROR: The reduction of '{os.path.abspath(args.folder)}' is incomplete: "
+            f"exit status {summary['exit_status']}, missing iterations {summary['missing']}, skipped iterations {summary['skipped']}. "
+            "The retention policy is not applied."
+        )
+    profiler.write(args.folder)
+    if not summary["complete"]:
+        sys.exit(1)
@@ -0,0 +1,277 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+
+from typing import *
+
+from .couette_config import COUETTE_XML, read_couette_parameters
+from .parallel import map_runs
+from .profiling import phase
+from .summary import SUMMARY_FILE, read_summary
+
+########################################
+# Study-wide index of the reduced results, stored as SQLite database 'results.sqlite' in the results directory.
+# Every run of '<results_dir>/RUNS' is scanned once, its parameters become columns of the
+# table 'runs' (with an index each) and its results rows of the table 'metrics', e.g.
+#     SELECT r.wall_velocity_x, m.value FROM metrics m JOIN runs r ON r.id = m.run_id
+#     WHERE m.output = 'res_postfilter.diff' AND r.wall_oscillations = 2
+# The columns are named after the couette.xml attributes, e.g. 'couette-test/domain/wall-oscillations'
+# becomes 'wall_oscillations', and the components of vectors, e.g. 'couette-test/domain/wall-velocity',
+# become 'wall_velocity_x', 'wall_velocity_y' and 'wall_velocity_z'.
+# The table 'parameters' maps each column to its couette.xml attribute.
+# The table 'stamp' identifies the state of the runs the index was built from, see results_stamp.
+
+# Name of the index within a results directory
+INDEX_FILE = "results.sqlite"
+
+# Tolerance when comparing floating point parameters
+_TOLERANCE = 1e-9
+
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _parameter_columns(key, value):
+    """
+    Splits a couette.xml parameter into its columns, e.g.
+    ('couette-test/domain/wall-velocity', '0.2 ; 0.0 ; 0.0') -> { 'wall_velocity_x': 0.2, 'wall_velocity_y': 0.0, 'wall_velocity_z': 0.0 }.
+    """
+    name = re.sub(r"\W", "_", key.rsplit("/", 1)[-1]).lower()
+    if value is None:
+        return { name: None }
+    components = [ _number(v.strip()) for v in str(value).split(";") ]
+    if len(components) == 1:
+        return { name: components[0] }
+    suffixes = "xyz" if len(components) == 3 else [ str(i) for i in range(len(components)) ]
+    return { f"{name}_{s}": c for s, c in zip(suffixes, components) }
+
+
+def results_stamp(results_dir, parameters=()):
+    """
+    Returns a stamp identifying the current state of the results of a study, as in cache.source_stamp:
+    the run directories and the name, size and mtime of the files their results are read from.
+
+    Args:
+        results_dir (str): The results directory of the study, containing the 'RUNS' directory.
+        parameters (Iterable[str]): The couette.xml parameters of runs reduced without them, see build_results_index.
+
+    Returns:
+        str: The stamp.
+    """
+    runs_dir = os.path.join(results_dir, "RUNS")
+    stamp = { "parameters": sorted(parameters), "runs": [], "sources": [] }
+    for folder in sorted(f for f in glob.glob(os.path.join(runs_dir, "*")) if os.path.isdir(f)):
+        stamp["runs"].append(os.path.basename(folder))
+        for path in sorted(glob.glob(os.path.join(folder, SUMMARY_FILE)) + glob.glob(os.path.join(folder, "*.diff"))):
+            st = os.stat(path)
+            stamp["sources"].append([os.path.relpath(path, runs_dir), st.st_size, st.st_mtime_ns])
+    return json.dumps(stamp)
+
+
+def _index_stamp(path):
+    """
+    Returns the stamp stored in an index, None if the index does not exist or has no stamp.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        db = sqlite3.connect(path)
+        try:
+            rows = db.execute("SELECT value FROM stamp").fetchall()
+        finally:
+            db.close()
+    except sqlite3.DatabaseError:
+        return None
+    return rows[0][0] if rows else None
+
+
+def scan_run(folder, parameters=()):
+    """
+    Reads the parameters and results of a run, from its reduce summary if available.
+    For runs reduced without a summary, the results are read from the '*.diff' files
+    and the parameters from the couette.xml.
+
+    Args:
+        folder (str): The run directory.
+        parameters (Iterable[str]): The couette.xml parameters to read if the summary does not contain them.
+
+    Returns:
+        Dict[str, Any]: The run name, scenario, walltime, parameters and results,
+            and the parameters that could not be read as the list 'missing'.
+    """
+    summary = read_summary(folder)
+    run = { "name": os.path.basename(folder), "scenario": None, "walltime": {}, "parameters": {}, "metrics": [], "missing": [] }
+    if summary is not None:
+        run["scenario"] = summary["scenario"]
+        run["walltime"] = summary["walltime"]
+        run["parameters"] = dict(summary["parameters"])
+        run["metrics"] = [
+            (output, m["filter"], m["metric"], m["quantity"], m["value"])
+            for output, m in summary["metrics"].items()
+        ]
+    else:
+        for path in sorted(glob.glob(os.path.join(folder, "*.diff"))):
+            with open(path, "r") as f:
+                run["metrics"].append((os.path.basename(path), None, None, None, float(f.read())))
+    missing = [ key for key in parameters if key not in run["parameters"] ]
+    if missing and os.path.isfile(os.path.join(folder, COUETTE_XML)):
+        run["parameters"].update(read_couette_parameters(folder, missing))
+    elif missing:
+        run["missing"] = missing
+    return run
+
+
+def build_results_index(results_dir, parameters=(), workers=None):
+    """
+    Scans all runs of a study and writes their parameters and results to '<results_dir>/results.sqlite'.
+    An existing index is replaced.
+    Parameters not recorded in the summary of a run (e.g. runs reduced without a summary) are read from its couette.xml,
+    the build fails if the run has none.
+
+    Args:
+        results_dir (str): The results directory of the study, containing the 'RUNS' directory.
+        parameters (Iterable[str]): The couette.xml parameters of runs reduced without them, e.g. 'couette-test/domain/wall-velocity'.
+        workers (Optional[int]): The number of processes scanning the runs, all cores if None.
+
+    Returns:
+        str: The path to the index.
+    """
+    # stamped before scanning, so that results fetched meanwhile trigger another build
+    stamp = results_stamp(results_dir, parameters)
+    folders = sorted(f for f in glob.glob(os.path.join(results_dir, "RUNS", "*")) if os.path.isdir(f))
+    runs = map_runs(scan_run, [ (folder, tuple(parameters)) for folder in folders ], workers)
+    incomplete = [ run for run in runs if run["missing"] ]
+    if incomplete:
+        raise FileNotFoundError(
+            f"{len(incomplete)} runs in '{os.path.join(results_dir, 'RUNS')}' (e.g. '{incomplete[0]['name']}') "
+            f"record the parameters {incomplete[0]['missing']} neither in a {SUMMARY_FILE} nor in a {COUETTE_XML}. "
+            f"Fetch their {COUETTE_XML} as well, e.g. fabsim <machine> fetch_results:regex=\"*<study>*\",files=\"{COUETTE_XML}\"."
+        )
+
+    ########################################
+    # Map the parameters to columns
+    columns: Dict[str, str] = {}
+    for run in runs:
+        row = {}
+        for key, value in run["parameters"].items():
+            for column, v in _parameter_columns(key, value).items():
+                if columns.setdefault(column, key) != key:
+                    raise ValueError(f"The parameters '{columns[column]}' and '{key}' both map to the column '{column}'.")
+                row[column] = v
+        run["row"] = row
+
+    ########################################
+    # Write the index to a temporary file, then replace the old one
+    path = os.path.join(results_dir, INDEX_FILE)
+    if os.path.exists(path + ".tmp"):
+        os.remove(path + ".tmp")
+    db = sqlite3.connect(path + ".tmp")
+    with db:
+        db.execute("CREATE TABLE stamp (value TEXT)")
+        db.execute("INSERT INTO stamp VALUES (?)", (stamp,))
+        db.execute("CREATE TABLE parameters (name TEXT PRIMARY KEY, key TEXT)")
+        db.executemany("INSERT INTO parameters VALUES (?, ?)", columns.items())
+        db.execute(
+            "CREATE TABLE runs (id INTEGER PRIMARY KEY, name TEXT UNIQUE, scenario INTEGER,"
+            " walltime_simulation REAL, walltime_reduce REAL"
+            + "".join(f', "{column}"' for column in columns) + ")"
+        )
+        db.execute(
+            "CREATE TABLE metrics (run_id INTEGER REFERENCES runs(id), output TEXT,"
+            " filter TEXT, metric TEXT, quantity TEXT, value REAL, PRIMARY KEY (output, run_id))"
+        )
+        for run_id, run in enumerate(runs):
+            db.execute(
+                f"INSERT INTO runs VALUES ({', '.join('?' * (5 + len(columns)))})",
+                [ run_id, run["name"], run["scenario"], run["walltime"].get("simulation"), run["walltime"].get("reduce") ]
+                + [ run["row"].get(column) for column in columns ],
+            )
+            db.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?)", [ (run_id,) + m for m in run["metrics"] ])
+        for column in columns:
+            db.execute(f'CREATE INDEX "runs_{column}" ON runs ("{column}")')
+    db.close()
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class ResultsIndex:
+    """
+    Read access to the results index of a study, see build_results_index.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path to the index.
+        """
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.columns = { column: key for column, key in self.db.execute("SELECT name, key FROM parameters") }
+
+    def query(self, sql, args=()):
+        """
+        Runs an SQL query on the index.
+
+        Returns:
+            List[Tuple]: The rows of the result.
+        """
+        with phase("index_query"):
+            return self.db.execute(sql, args).fetchall()
+
+    def value(self, output, **parameters):
+        """
+        Returns the result of the single run with the given parameters, e.g.
+        index.value("res_postfilter.diff", wall_oscillations=2, wall_velocity_x=0.2).
+
+        Args:
+            output (str): The name of the result, e.g. 'res_raw.diff'.
+            parameters (Any): The parameter columns and their values.
+
+        Returns:
+            float: The value of the result.
+        """
+        sql = "SELECT m.value FROM metrics m JOIN runs r ON r.id = m.run_id WHERE m.output = ?"
+        args: List[Any] = [output]
+        for column, value in parameters.items():
+            if column not in self.columns:
+                raise KeyError(f"Unknown parameter '{column}' in '{self.path}', choose from {list(self.columns)}.")
+            if isinstance(value, (int, float)):
+                sql += f' AND r."{column}" BETWEEN ? AND ?'
+                args += [value - _TOLERANCE, value + _TOLERANCE]
+            else:
+                sql += f' AND r."{column}" = ?'
+                args.append(value)
+        rows = self.query(sql, args)
+        if len(rows) != 1:
+            raise KeyError(f"Found {len(rows)} runs with the result '{output}' and the parameters {parameters} in '{self.path}'.")
+        return rows[0][0]
+
+    def close(self):
+        self.db.close()
+
+
+def open_results_index(results_dir, parameters=(), workers=None):
+    """
+    Opens the results index of a study, and builds it first if it does not exist yet
+    or if runs were added, removed, or their results changed since it was built (see results_stamp),
+    e.g. after fetching new results.
+
+    Args:
+        results_dir (str): The results directory of the study, containing the 'RUNS' directory.
+        parameters (Iterable[str]): The couette.xml parameters of runs reduced without them, see build_results_index.
+        workers (Optional[int]): The number of processes scanning the runs, all cores if None.
+
+    Returns:
+        ResultsIndex: The index.
+    """
+    path = os.path.join(results_dir, INDEX_FILE)
+    if _index_stamp(path) != results_stamp(results_dir, parameters):
+        with phase("index_build"):
+            build_results_index(results_dir, parameters, workers)
+    return ResultsIndex(path)
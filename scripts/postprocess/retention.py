@@ -0,0 +1,121 @@
+import os
+import re
+import tarfile
+
+from typing import *
+
+########################################
+# Retention policy for the raw outputs of a run, applied after a successful reduction.
+# Declared in the 'retention' section of reduce.yml, e.g.
+#     retention:
+#       raw: archive        # keep | delete | stride:<N> | archive
+#       checkpoints: delete # keep | delete
+# raw:
+#   - keep:       leave the vtk and csv outputs untouched
+#   - delete:     remove the vtk and csv outputs
+#   - stride:<N>: keep only the iterations divisible by N, in the vtk series and in the csv rows
+#   - archive:    pack the vtk and csv outputs into one compressed archive and remove them
+# checkpoints:
+#   - delete:     remove the MD checkpoints copied into the run directory
+
+DEFAULT_RETENTION = { "raw": "keep", "checkpoints": "keep" }
+
+# Name of the archive created by the 'archive' policy
+RAW_ARCHIVE = "raw_outputs.tar.gz"
+
+_STRIDE = re.compile(r"^stride:(\d+)$")
+
+
+def validate_retention(retention):
+    """
+    Completes and validates the retention section of reduce.yml.
+
+    Args:
+        retention (Optional[Dict[str, str]]): The retention section.
+
+    Returns:
+        Dict[str, str]: The completed retention policy.
+    """
+    retention = { **DEFAULT_RETENTION, **(retention or {}) }
+    stride = _STRIDE.match(str(retention["raw"]))
+    if retention["raw"] not in ("keep", "delete", "archive") and (stride is None or int(stride.group(1)) < 1):
+        raise ValueError(f"Unknown retention policy '{retention['raw']}' for raw outputs, choose keep, delete, stride:<N> or archive.")
+    if retention["checkpoints"] not in ("keep", "delete"):
+        raise ValueError(f"Unknown retention policy '{retention['checkpoints']}' for checkpoints, choose keep or delete.")
+    return retention
+
+
+def find_raw_outputs(folder):
+    """
+    Finds the raw outputs of a run, i.e. the vtk files of the LB solver and the csv files of the filters.
+
+    Returns:
+        List[str]: The sorted filenames.
+    """
+    return sorted(f for f in os.listdir(folder) if f.endswith(".vtk") or f.endswith(".csv"))
+
+
+def apply_retention(folder, retention):
+    """
+    Applies the retention policy to the raw outputs and checkpoints of a run.
+    Must only be called after the run has been reduced successfully.
+
+    Args:
+        folder (str): The run directory.
+        retention (Dict[str, str]): The retention policy, see validate_retention.
+
+    Returns:
+        int: The number of removed files.
+    """
+    removed = 0
+    raw = find_raw_outputs(folder)
+    policy = retention["raw"]
+
+    if policy == "archive" and raw:
+        # write to a temporary file first, so that the outputs are only removed once the archive is complete
+        tmp_path = os.path.join(folder, RAW_ARCHIVE + ".tmp")
+        with tarfile.open(tmp_path, "w:gz") as tar:
+            for f in raw:
+                tar.add(os.path.join(folder, f), arcname=f)
+        os.replace(tmp_path, os.path.join(folder, RAW_ARCHIVE))
+
+    if policy in ("delete", "archive"):
+        for f in raw:
+            os.remove(os.path.join(folder, f))
+        removed += len(raw)
+    elif policy.startswith("stride:"):
+        removed += _thin_raw_outputs(folder, raw, int(policy.split(":")[1]))
+
+    if retention["checkpoints"] == "delete":
+        checkpoints = [f for f in os.listdir(folder) if f.endswith(".checkpoint")]
+        for f in checkpoints:
+            os.remove(os.path.join(folder, f))
+        removed += len(checkpoints)
+
+    return removed
+
+
+def _thin_raw_outputs(folder, raw, stride):
+    """
+    Keeps only the iterations divisible by stride, in the vtk series (e.g. 'LBCouette_r0_c1000.vtk')
+    and in the rows of the csv files (e.g. '1000;...').
+
+    Returns:
+        int: The number of removed vtk files.
+    """
+    removed = 0
+    for f in raw:
+        path = os.path.join(folder, f)
+        if f.endswith(".vtk"):
+            if int(f.split("_")[-1][1:-4]) % stride != 0:
+                os.remove(path)
+                removed += 1
+            continue
+        tmp_path = path + ".tmp"
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            for line in src:
+                iteration = line.split(b";", 1)[0]
+                if not iteration.strip().isdigit() or int(iteration) % stride == 0:
+                    dst.write(line)
+        os.replace(tmp_path, path)
+    return removed
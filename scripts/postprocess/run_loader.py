@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import *
+
+from .couette_config import read_filter_outputs
+from .profiling import phase
+from .readers import find_vtk_files, get_array_from_cfd_vtk, get_array_from_filter_csv
+
+
+class RunData(NamedTuple):
+    """
+    All postprocessing inputs of a single run directory (RUNS/<name>).
+
+    Attributes:
+        folder (str): The run directory.
+        iterations (np.ndarray): The iterations shared by all arrays.
+        filters (Dict[str, np.ndarray]): The (read-only) filter outputs, keyed by filter name
+            (e.g. 'raw-md' for '0_raw-md.csv'), see FILTER_QUANTITIES.
+        cfd (Optional[np.ndarray]): The (read-only) CFD data from the vtk files, see CFD_QUANTITIES.
+    """
+    folder: str
+    iterations: np.ndarray
+    filters: Dict[str, np.ndarray]
+    cfd: Optional[np.ndarray]
+
+
+def find_filter_outputs(folder):
+    """
+    Finds the filter outputs (e.g. '0_raw-md.csv') of rank 0 in the given folder.
+    Only the outputs configured in the filter pipeline of the couette.xml are considered,
+    all csv files of rank 0 if the run contains no couette.xml.
+
+    Args:
+        folder (str): The run directory.
+
+    Returns:
+        Dict[str, str]: The filenames, keyed by filter name.
+    """
+    configured = read_filter_outputs(folder)
+    if configured is not None:
+        return { location[:-4]: f"0_{location}" for location in configured if location.endswith(".csv") }
+    return { f[2:-4]: f for f in sorted(os.listdir(folder)) if f.startswith("0_") and f.endswith(".csv") }
+
+
+@lru_cache(maxsize=32)
+def load_run(folder, scenario=30, filters=None, cfd=True, min=100, max=1000, step=10, workers=None):
+    """
+    Loads the filter outputs and the vtk series of a run directory in a single pass.
+    All files are read concurrently and share one iteration and cell index.
+    The result is cached, so that loading a run for several plots costs one read.
+    As all callers share the cached arrays, they are read-only; copy them before modifying them.
+
+    Args:
+        folder (str): The run directory.
+        scenario (int): The scenario number.
+        filters (Optional[Tuple[str, ...]]): The filter names to load, the configured filter outputs if None (see find_filter_outputs).
+        cfd (bool): Whether to load the vtk series.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+        workers (Optional[int]): The number of threads to read with.
+
+    Returns:
+        RunData: The bundle of all inputs of the run.
+    """
+    if filters is None:
+        filenames = find_filter_outputs(folder)
+    else:
+        filenames = { name: f"0_{name}.csv" for name in filters }
+    missing = [ f for f in filenames.values() if not os.path.isfile(os.path.join(folder, f)) ]
+    if missing:
+        raise FileNotFoundError(f"Filter outputs {missing} not found in '{folder}'.")
+
+    with phase("load_run"), ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(get_array_from_filter_csv, folder, filename, min, max, step, scenario)
+            for name, filename in filenames.items()
+        }
+        cfd_future = executor.submit(get_array_from_cfd_vtk, folder, scenario, min, max, step) if cfd else None
+        arrays = { name: future.result() for name, future in futures.items() }
+        cfd_array = cfd_future.result() if cfd else None
+
+    if cfd:
+        iterations = np.array([i for i, _ in find_vtk_files(folder, min, max, step)])
+    else:
+        iterations = np.arange(-(-min // step) * step, max + 1, step)
+    for name, array in arrays.items():
+        if array.shape[0] != len(iterations):
+            raise ValueError(f"'{filenames[name]}' contains {array.shape[0]} iterations, expected {len(iterations)}.")
+    for array in [iterations, cfd_array, *arrays.values()]:
+        if array is not None:
+            array.flags.writeable = False
+
+    return RunData(folder=folder, iterations=iterations, filters=arrays, cfd=cfd_array)
@@ -4,7 +4,8 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from typing import *
-from vtk import *
+
+from plugins.FabMaMiCo.scripts.postprocess.results_index import open_results_index
 
 rc_fonts = {
     "font.size": 11,
@@ -35,6 +36,12 @@ rc_fonts = {
 
 plt.rcParams.update(rc_fonts)
 
+# Parameters of the runs, see config_files/study2_{gauss,multimd}_MD*/reduce.yml
+PARAMETERS = [
+    "couette-test/domain/wall-velocity",
+    "couette-test/domain/wall-oscillations",
+]
+
 def create_plot(
     scenario: int,
     oscillations: List[int],
@@ -42,30 +49,27 @@ def create_plot(
     results_dir_gauss: str,
     results_dir_multimd: str,
     output_dir: str,
-    show_plots: bool = False
+    show_plots: bool = False,
+    workers: Optional[int] = None
 ):
     os.makedirs(output_dir, exist_ok=True)
 
     # initialize results array
     res = np.zeros(shape=(len(oscillations), len(wall_velocities), 4))
 
+    # Query the results of all runs from the results indices of both studies
+    index_f = open_results_index(results_dir_gauss, PARAMETERS, workers)
+    index_mi = open_results_index(results_dir_multimd, PARAMETERS, workers)
+
     # iterate over oscillations and wall velocities
     for i, osc in enumerate(oscillations):
         for k, wv in enumerate(wall_velocities):
-
-            RUN_F = f"gauss_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
-            FOLDER_F  = os.path.join( results_dir_gauss, "RUNS", RUN_F)
-
-            RUN_MI = f"multimd_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
-            FOLDER_MI = os.path.join( results_dir_multimd, "RUNS", RUN_MI )
-
-            diff1 = float(open(os.path.join(FOLDER_F, "res_raw.diff"), "r").read())
-            diff2 = float(open(os.path.join(FOLDER_F, "res_gauss_2d.diff"), "r").read())
-            diff3 = float(open(os.path.join(FOLDER_F, "res_gauss_3d.diff"), "r").read())
-            diff4 = float(open(os.path.join(FOLDER_MI, "res_multimd.diff"), "r").read())
-
-            # Store results in array
-            res[i, k]  = [diff1, diff2, diff3, diff4]
+            res[i, k] = [
+                index_f.value("res_raw.diff", wall_oscillations=osc, wall_velocity_x=wv),
+                index_f.value("res_gauss_2d.diff", wall_oscillations=osc, wall_velocity_x=wv),
+                index_f.value("res_gauss_3d.diff", wall_oscillations=osc, wall_velocity_x=wv),
+                index_mi.value("res_multimd.diff", wall_oscillations=osc, wall_velocity_x=wv),
+            ]
 
     # Plot results
     fig, axs = plt.subplots(1, 2, figsize=(12, 5))
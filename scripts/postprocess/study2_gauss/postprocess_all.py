@@ -5,9 +5,51 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from typing import *
-from vtk import *
 
-from plugins.FabMaMiCo.scripts.postprocess.readers import get_df_from_filter_csv, get_df_from_cfd_vtk
+from plugins.FabMaMiCo.scripts.postprocess.parallel import map_runs
+from plugins.FabMaMiCo.scripts.postprocess.readers import CFD_QUANTITIES, FILTER_QUANTITIES
+from plugins.FabMaMiCo.scripts.postprocess.run_loader import load_run
+
+
+def mse_of_run(scenario, folder_f, folder_mi):
+    """
+    Computes the mean squared differences between CFD and the (filtered) MD of a run.
+
+    Args:
+        scenario (int): The scenario number.
+        folder_f (str): The run directory of the Gaussian filtering ensemble.
+        folder_mi (str): The run directory of the Multi-MD simulation.
+
+    Returns:
+        List[float]: The differences of Raw, Gauss-2D, Gauss-3D and Multi-Instance MD.
+    """
+    print("+---------------------------------------")
+    print(f"| Processing RUN '{os.path.basename(folder_f)}'")
+    print("+---------------------------------------")
+
+    # Load the x-velocities from files, shape (iterations, z, y, x)
+    run_f  = load_run(folder_f, scenario=scenario, filters=("raw-md", "gauss-2d", "gauss-3d"))
+    run_mi = load_run(folder_mi, scenario=scenario, filters=("nofilter",), cfd=False)
+    vel_x = FILTER_QUANTITIES.index("vel_x")
+    md_raw      = run_f.filters["raw-md"][..., vel_x]
+    my_gauss_2d = run_f.filters["gauss-2d"][..., vel_x]
+    my_gauss_3d = run_f.filters["gauss-3d"][..., vel_x]
+    md_mimd     = run_mi.filters["nofilter"][..., vel_x]
+
+    cfd = run_f.cfd[..., CFD_QUANTITIES.index("vel_x")]
+
+    # Calculate mean squared differences
+    diff1 = np.square(cfd -      md_raw).mean()
+    diff2 = np.square(cfd - my_gauss_2d).mean()
+    diff3 = np.square(cfd - my_gauss_3d).mean()
+    diff4 = np.square(cfd -     md_mimd).mean()
+
+    print(f"Mean difference between CFD and Raw: {diff1}")
+    print(f"Mean difference between CFD and Gauss-2D: {diff2}")
+    print(f"Mean difference between CFD and Gauss-3D: {diff3}")
+    print(f"Mean difference between CFD and Multi-Instance MD: {diff4}")
+
+    return [diff1, diff2, diff3, diff4]
 
 
 def generate_plots(
@@ -17,7 +59,8 @@ def generate_plots(
         results_dir_gauss: str,
         results_dir_multimd: str,
         output_dir: str,
-        from_npy: bool = False
+        from_npy: bool = False,
+        workers: Optional[int] = None
     ):
 
     os.makedirs(output_dir, exist_ok=True)
@@ -26,38 +69,17 @@ def generate_plots(
     res = np.zeros(shape=(2, len(wall_velocities), 4))
     # iterate over oscillations and wall velocities
     if not from_npy:
+        runs = []
         for i, osc in enumerate(oscillations):
             for k, wv in enumerate(wall_velocities):
                 RUN_F = f"gauss_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
                 FOLDER_F  = os.path.join( results_dir_gauss, "RUNS", RUN_F)
                 RUN_MI = f"MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
                 FOLDER_MI = os.path.join( results_dir_multimd, "RUNS", RUN_MI )
+                runs.append((scenario, FOLDER_F, FOLDER_MI))
 
-                print("+---------------------------------------")
-                print(f"| Processing RUN '{RUN_F}'")
-                print("+---------------------------------------")
-
-                # Load data from files
-                md_raw      = get_df_from_filter_csv(FOLDER_F,  "0_raw-md.csv"  )
-                my_gauss_2d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-2d.csv")
-                my_gauss_3d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-3d.csv")
-                md_mimd     = get_df_from_filter_csv(FOLDER_MI, "0_nofilter.csv")
-
-                cfd = get_df_from_cfd_vtk(FOLDER_F, length=md_raw.shape[0], scenario=scenario)
-
-                # Calculate mean squared differences
-                diff1 = np.square( cfd['vel_x_mamico'].to_numpy() -      md_raw['vel_x'].to_numpy()).mean()
-                diff2 = np.square( cfd['vel_x_mamico'].to_numpy() - my_gauss_2d['vel_x'].to_numpy()).mean()
-                diff3 = np.square( cfd['vel_x_mamico'].to_numpy() - my_gauss_3d['vel_x'].to_numpy()).mean()
-                diff4 = np.square( cfd['vel_x_mamico'].to_numpy() -     md_mimd['vel_x'].to_numpy()).mean()
-
-                # Store results in array
-                res[i, k]  = [diff1, diff2, diff3, diff4]
-
-                print(f"Mean difference between CFD and Raw: {diff1}")
-                print(f"Mean difference between CFD and Gauss-2D: {diff2}")
-                print(f"Mean difference between CFD and Gauss-3D: {diff3}")
-                print(f"Mean difference between CFD and Multi-Instance MD: {diff4}")
+        # Process the runs in parallel and store the results in array
+        res[:] = np.array(map_runs(mse_of_run, runs, workers)).reshape(res.shape)
 
         # Store results in file
         np.save(os.path.join(output_dir, f"study_3_filter_gauss_MSE_MD{scenario}_all.npy"), res)
@@ -97,6 +119,7 @@ if __name__ == "__main__":
     parser.add_argument('--results_dir_gauss', type=str, help='Folder containing the results from the ensemble run with Gaussian filtering')
     parser.add_argument('--results_dir_multimd', type=str, help='Folder containing the results from Multi-MD simulation')
     parser.add_argument('--output_dir', type=str, help='Folder to save the plot')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes to load the runs with (default: all cores)')
     args = parser.parse_args()
     generate_plots(
         scenario=args.scenario,
@@ -104,5 +127,6 @@ if __name__ == "__main__":
         wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8],
         results_dir_gauss=args.results_dir_gauss,
         results_dir_multimd=args.results_dir_multimd,
-        output_dir=args.output_dir
+        output_dir=args.output_dir,
+        workers=args.workers
     )
@@ -5,9 +5,10 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from typing import *
-from vtk import *
 
-from plugins.FabMaMiCo.scripts.postprocess.readers import get_df_from_filter_csv, get_df_from_cfd_vtk
+from plugins.FabMaMiCo.scripts.postprocess.readers import CFD_QUANTITIES, FILTER_QUANTITIES
+from plugins.FabMaMiCo.scripts.postprocess.run_loader import load_run
+from plugins.FabMaMiCo.scripts.postprocess.study_store import CFD_SOURCE, StudyStore
 
 
 def plot_over_time(
@@ -16,10 +17,19 @@ def plot_over_time(
         wall_velocities: List[float],
         results_dir_gauss: str,
         results_dir_multimd: str,
-        output_dir: str
+        output_dir: str,
+        store_dir: Optional[str] = None
     ):
+    """
+    Plots the x-velocity of the gauss runs and the multi-instance runs over time, averaged per z-slice.
+    If store_dir is given, the gauss runs are sliced from the study stores written by
+    the task mamico_study2_gauss_store instead of being read run by run.
+    """
 
     os.makedirs(output_dir, exist_ok=True)
+    stores = None
+    if store_dir is not None:
+        stores = { name: StudyStore(os.path.join(store_dir, name)) for name in ["raw-md", "gauss-2d", "gauss-3d", CFD_SOURCE] }
 
     for osc in oscillations:
         for wv in wall_velocities:
@@ -32,30 +42,41 @@ def plot_over_time(
             print(f"| Processing RUN '{RUN_F}'")
             print("+-----------------------------------------------")
 
-            md_raw      = get_df_from_filter_csv(FOLDER_F,  "0_raw-md.csv"  )
-            my_gauss_2d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-2d.csv")
-            my_gauss_3d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-3d.csv")
-            md_mimd     = get_df_from_filter_csv(FOLDER_MI, "0_nofilter.csv")
-
-            cfd_f  = get_df_from_cfd_vtk(FOLDER_F,  length=md_raw.shape[0], scenario=scenario)
-
-            vtk_f  = cfd_f.groupby( ['iteration', 'idx_z'])['vel_x_mamico'].mean().reset_index()
-
-            csv_raw = md_raw.groupby(      ['iteration', 'idx_z'] )['vel_x'].mean().reset_index()
-            csv_2d  = my_gauss_2d.groupby( ['iteration', 'idx_z'] )['vel_x'].mean().reset_index()
-            csv_3d  = my_gauss_3d.groupby( ['iteration', 'idx_z'] )['vel_x'].mean().reset_index()
-            csv_mi  = md_mimd.groupby(     ['iteration', 'idx_z'] )['vel_x'].mean().reset_index()
+            # Load the x-velocities from files, shape (iterations, z, y, x)
+            run_mi = load_run(FOLDER_MI, scenario=scenario, filters=("nofilter",), cfd=False)
+            names = ["raw-md", "gauss-2d", "gauss-3d"]
+            if stores is None:
+                run_f = load_run(FOLDER_F, scenario=scenario, filters=("raw-md", "gauss-2d", "gauss-3d"))
+                vel_f = { name: run_f.filters[name][..., FILTER_QUANTITIES.index("vel_x")] for name in names }
+                cfd_f = run_f.cfd[..., CFD_QUANTITIES.index("vel_x")]
+                iterations = run_f.iterations
+            else:
+                vel_f = { name: stores[name].run(oscillations=osc, wall_velocity=wv)[..., stores[name].quantity("vel_x")] for name in names }
+                cfd_f = stores[CFD_SOURCE].run(oscillations=osc, wall_velocity=wv)[..., stores[CFD_SOURCE].quantity("vel_x")]
+                iterations = stores[CFD_SOURCE].iterations
+                if not np.array_equal(iterations, run_mi.iterations):
+                    raise ValueError(f"The study store in '{store_dir}' contains the iterations {iterations}, expected {run_mi.iterations}.")
+            md_raw      = vel_f["raw-md"]
+            my_gauss_2d = vel_f["gauss-2d"]
+            my_gauss_3d = vel_f["gauss-3d"]
+            md_mimd     = run_mi.filters["nofilter"][..., FILTER_QUANTITIES.index("vel_x")]
+
+            # Average over the z-slices, shape (iterations, z)
+            vtk_f  = cfd_f.mean(axis=(2, 3))
+
+            csv_raw = md_raw.mean(axis=(2, 3))
+            csv_2d  = my_gauss_2d.mean(axis=(2, 3))
+            csv_3d  = my_gauss_3d.mean(axis=(2, 3))
+            csv_mi  = md_mimd.mean(axis=(2, 3))
 
             fig, axs = plt.subplots(5, 1, figsize=(12, 15))
-            iterations = np.arange(100, 1001, 10)
 
             max_abs_val = 0.0
 
             titles = ["Lattice-Boltzmann CFD", "Pre-Gauss-Filter MD", "Gauss-2D-Filter MD", "Gauss-3D-Filter MD", "Multi-Instance MD"]
-            columns = ["vel_x_mamico", "vel_x", "vel_x", "vel_x", "vel_x"]
             for k, d_f in enumerate([vtk_f, csv_raw, csv_2d, csv_3d, csv_mi]):
                 for i in range(6): # for each z-slice
-                    z_vals = d_f[d_f['idx_z'] == i][columns[k]].to_numpy()
+                    z_vals = d_f[:, i]
                     axs[k].plot(iterations, z_vals, label=f"z_idx = {i}", color=f"C{i}")
                     max_abs_val = max(max_abs_val, np.abs(z_vals).max())
 
@@ -78,6 +99,7 @@ if __name__ == "__main__":
     parser.add_argument('--results_dir_gauss', type=str, help='Folder containing the results from the ensemble run with Gaussian filtering')
     parser.add_argument('--results_dir_multimd', type=str, help='Folder containing the results from Multi-MD simulation')
     parser.add_argument('--output_dir', type=str, help='Folder to save the plot')
+    parser.add_argument('--store_dir', type=str, default=None, help='Folder containing the study stores of the Gaussian filtering runs (optional)')
     args = parser.parse_args()
     plot_over_time(
         scenario=args.scenario,
@@ -85,5 +107,6 @@ if __name__ == "__main__":
         wall_velocities=[0.2, 0.4, 0.6, 0.8, 1.0],
         results_dir_gauss=args.results_dir_gauss,
         results_dir_multimd=args.results_dir_multimd,
-        output_dir=args.output_dir
+        output_dir=args.output_dir,
+        store_dir=args.store_dir
     )
@@ -5,9 +5,9 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from typing import *
-from vtk import *
 
-from plugins.FabMaMiCo.scripts.postprocess.readers import get_df_from_filter_csv, get_df_from_cfd_vtk
+from plugins.FabMaMiCo.scripts.postprocess.readers import CFD_QUANTITIES, FILTER_QUANTITIES
+from plugins.FabMaMiCo.scripts.postprocess.run_loader import load_run
 
 
 def plot_over_time(
@@ -35,29 +35,24 @@ def plot_over_time(
             print(f"| Processing RUN '{RUN_F}'")
             print("+-----------------------------------------------")
 
-            md_raw      = get_df_from_filter_csv(FOLDER_F,  "0_raw-md.csv"  )
-            my_gauss_2d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-2d.csv")
-            my_gauss_3d = get_df_from_filter_csv(FOLDER_F,  "0_gauss-3d.csv")
-            md_mimd     = get_df_from_filter_csv(FOLDER_MI, "0_nofilter.csv")
+            # Load the x-velocities of the selected cell from files, shape (iterations,)
+            run_f  = load_run(FOLDER_F, scenario=scenario, filters=("raw-md", "gauss-2d", "gauss-3d"))
+            run_mi = load_run(FOLDER_MI, scenario=scenario, filters=("nofilter",), cfd=False)
+            vel_x = FILTER_QUANTITIES.index("vel_x")
+            csv_raw = run_f.filters["raw-md"][:, z, y, x, vel_x]
+            csv_2d  = run_f.filters["gauss-2d"][:, z, y, x, vel_x]
+            csv_3d  = run_f.filters["gauss-3d"][:, z, y, x, vel_x]
+            csv_mi  = run_mi.filters["nofilter"][:, z, y, x, vel_x]
 
-            cfd_f  = get_df_from_cfd_vtk(FOLDER_F,  length=md_raw.shape[0], scenario=scenario)
-
-            cfd_f = cfd_f[(cfd_f['idx_x'] == x) & (cfd_f['idx_y'] == y) & (cfd_f['idx_z'] == z)]
-
-            csv_raw = md_raw[(md_raw['idx_x'] == x) & (md_raw['idx_y'] == y) & (md_raw['idx_z'] == z)]
-            csv_2d  = my_gauss_2d[(my_gauss_2d['idx_x'] == x) & (my_gauss_2d['idx_y'] == y) & (my_gauss_2d['idx_z'] == z)]
-            csv_3d  = my_gauss_3d[(my_gauss_3d['idx_x'] == x) & (my_gauss_3d['idx_y'] == y) & (my_gauss_3d['idx_z'] == z)]
-            csv_mi  = md_mimd[(md_mimd['idx_x'] == x) & (md_mimd['idx_y'] == y) & (md_mimd['idx_z'] == z)]
+            cfd_f  = run_f.cfd[:, z, y, x, CFD_QUANTITIES.index("vel_x")]
 
             fig, axs = plt.subplots(5, 1, figsize=(12, 15))
-            iterations = np.arange(100, 1001, 10)
+            iterations = run_f.iterations
 
             max_abs_val = 0.0
 
             titles = ["Lattice-Boltzmann CFD", "Pre-Gauss-Filter MD", "Gauss-2D-Filter MD", "Gauss-3D-Filter MD", "Multi-Instance MD"]
-            columns = ["vel_x_mamico", "vel_x", "vel_x", "vel_x", "vel_x"]
-            for k, d_f in enumerate([cfd_f, csv_raw, csv_2d, csv_3d, csv_mi]):
-                z_vals = d_f[columns[k]].to_numpy()
+            for k, z_vals in enumerate([cfd_f, csv_raw, csv_2d, csv_3d, csv_mi]):
                 axs[k].plot(iterations, z_vals, label=f"cell {x},{y},{z}")
 
                 axs[k].set_xlabel("Iteration")
@@ -8,7 +8,8 @@ import seaborn as sns
 from matplotlib import pyplot as plt
 from matplotlib.colors import TwoSlopeNorm, LogNorm
 from typing import *
-from vtk import *
+
+from plugins.FabMaMiCo.scripts.postprocess.results_index import open_results_index
 
 # plt.style.use('tableau-colorblind10')
 
@@ -41,6 +42,15 @@ rc_fonts = {
 
 plt.rcParams.update(rc_fonts)
 
+# Parameters of the runs, see config_files/study2_nlm_MD*/reduce.yml
+PARAMETERS = [
+    "couette-test/domain/wall-velocity",
+    "couette-test/domain/wall-oscillations",
+    "filter-pipeline/post-multi-instance/nlm-junction/NLM/sigsq_rel",
+    "filter-pipeline/post-multi-instance/nlm-junction/NLM/hsq_rel",
+    "filter-pipeline/post-multi-instance/nlm-junction/NLM/time-window-size",
+]
+
 def create_plot(
     scenario: int,
     oscillations: List[int],
@@ -50,10 +60,14 @@ def create_plot(
     tws: int,
     results_dir_nlm_sq: str,
     output_dir: str,
-    show_plots: bool = False
+    show_plots: bool = False,
+    workers: Optional[int] = None
 ):
     os.makedirs(output_dir, exist_ok=True)
 
+    # Query the results of all runs from the results index of the study
+    index = open_results_index(results_dir_nlm_sq, PARAMETERS, workers)
+
     # Iterate over oscillations
     for i, osc in enumerate(oscillations):
 
@@ -61,17 +75,13 @@ def create_plot(
         res = np.zeros(shape=(len(wall_velocities) * len(sigsq_rel) * len(hsq_rel), 4))
 
         for k, wv in enumerate(wall_velocities):
-
-            RUN_F = f"nlm_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
-            FOLDER_F  = os.path.join( results_dir_nlm_sq, "RUNS", RUN_F)
-
             for i, sigsq in enumerate(sigsq_rel):
                 for j, hsq in enumerate(hsq_rel):
                     # Get data for NLM Filtered
-                    RUN_F     = f"nlm_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}_sigsqrel{sigsq:.4f}_hsqrel{hsq:.4f}_tws0{tws}".replace(".", "")
-                    FOLDER_F  = os.path.join( results_dir_nlm_sq, "RUNS", RUN_F)
-
-                    diff = float(open(os.path.join(FOLDER_F, "res_postfilter.diff"), "r").read())
+                    diff = index.value(
+                        "res_postfilter.diff",
+                        wall_oscillations=osc, wall_velocity_x=wv, sigsq_rel=sigsq, hsq_rel=hsq, time_window_size=tws
+                    )
                     res[k*len(sigsq_rel)*len(hsq_rel) + i*len(hsq_rel) + j] = [wv, sigsq, hsq, diff]
 
         ## Plot the results
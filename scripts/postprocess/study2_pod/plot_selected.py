@@ -4,7 +4,8 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from typing import *
-from vtk import *
+
+from plugins.FabMaMiCo.scripts.postprocess.results_index import open_results_index
 
 rc_fonts = {
     "font.size": 11,
@@ -35,6 +36,14 @@ rc_fonts = {
 
 plt.rcParams.update(rc_fonts)
 
+# Parameters of the runs, see config_files/study2_{pod,multimd}_MD*/reduce.yml
+PARAMETERS = [
+    "couette-test/domain/wall-velocity",
+    "couette-test/domain/wall-oscillations",
+    "filter-pipeline/per-instance/my-pod/POD/time-window-size",
+    "filter-pipeline/per-instance/my-pod/POD/kmax",
+]
+
 def create_plot(
     scenario: int,
     oscillations: List[int],
@@ -44,37 +53,37 @@ def create_plot(
     results_dir_pod: str,
     results_dir_multimd: str,
     output_dir: str,
-    show_plots: bool = False
+    show_plots: bool = False,
+    workers: Optional[int] = None
 ):
     os.makedirs(output_dir, exist_ok=True)
 
     # initialize results array
     res = np.zeros(shape=(len(oscillations), len(wall_velocities), len(time_window_sizes)+2, len(k_maxs)))
 
+    # Query the results of all runs from the results indices of both studies
+    index_f = open_results_index(results_dir_pod, PARAMETERS, workers)
+    index_mi = open_results_index(results_dir_multimd, PARAMETERS[:2], workers)
+
     # iterate over oscillations and wall velocities
+    diffs_mi = np.zeros(shape=(len(oscillations), len(wall_velocities)))
+    diffs_f = np.zeros(shape=(len(oscillations), len(wall_velocities), len(time_window_sizes), len(k_maxs), 2))
     for i, osc in enumerate(oscillations):
         for k, wv in enumerate(wall_velocities):
 
-            RUN_MI = f"multimd_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}"
-            FOLDER_MI = os.path.join( results_dir_multimd, "RUNS", RUN_MI )
-
-            diff3 = float(open(os.path.join(FOLDER_MI, "res_multimd.diff"), "r").read())
-
-            res[i, k, 1, 0] = diff3
+            diffs_mi[i, k] = index_mi.value("res_multimd.diff", wall_oscillations=osc, wall_velocity_x=wv)
 
             for l, tws in enumerate(time_window_sizes):
                 for m, km in enumerate(k_maxs):
-                    RUN_F = f"pod_MD{scenario}_{osc}osc_wv{str(wv).replace('.', '')}_tws{tws}_kmax{km}"
-                    FOLDER_F  = os.path.join( results_dir_pod, "RUNS", RUN_F)
+                    params = { "wall_oscillations": osc, "wall_velocity_x": wv, "time_window_size": tws, "kmax": km }
+                    diffs_f[i, k, l, m] = [ index_f.value("res_raw.diff", **params), index_f.value("res_pod.diff", **params) ]
 
-                    diff1 = float(open(os.path.join(FOLDER_F, "res_raw.diff"), "r").read())
-                    diff2 = float(open(os.path.join(FOLDER_F, "res_pod.diff"), "r").read())
+    # The unfiltered MD does not depend on kmax
+    assert (diffs_f[..., 1:, 0] == diffs_f[..., :1, 0]).all()
 
-                    res[i, k, l+2, m] = diff2
-                    if m != 0:
-                        assert diff1 == res[i, k, 0, 0]
-                    else:
-                        res[i, k, 0, 0] = diff1
+    res[:, :, 0, 0] = diffs_f[:, :, -1, 0, 0]
+    res[:, :, 1, 0] = diffs_mi
+    res[:, :, 2:, :] = diffs_f[..., 1]
 
 
     for i, osc in enumerate(oscillations):
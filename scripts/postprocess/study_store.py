@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+
+from typing import *
+
+from .readers import CFD_QUANTITIES, FILTER_QUANTITIES, get_array_from_cfd_vtk, get_array_from_filter_csv
+
+########################################
+# Study-wide store of the postprocessing inputs of all runs of a study.
+# The runs are packed into one array of shape (run, iteration, z, y, x, quantity)
+# in '<path>.npy', which is opened memory-mapped, so slicing only touches the
+# pages that are actually needed. The sidecar '<path>.json' maps the parameter
+# tuple of each run (e.g. oscillations, wall velocity) to its offset along the run axis.
+
+# Source name for the CFD data of the vtk files
+CFD_SOURCE = "cfd"
+
+
+class StudyStore:
+    """
+    Read-only, memory-mapped view on a study store written by build_study_store.
+
+    Attributes:
+        data (np.ndarray): The memory-mapped array of shape (run, iteration, z, y, x, quantity).
+        params (List[str]): The names of the run parameters.
+        quantities (List[str]): The names of the quantities along the last axis.
+        iterations (np.ndarray): The iterations along the second axis.
+        runs (List[Dict[str, Any]]): The name and parameters of each run, ordered by offset.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the store at the given path (without extension).
+
+        Args:
+            path (str): The path to the store.
+        """
+        with open(f"{path}.json", "r") as f:
+            index = json.load(f)
+        self.data = np.load(f"{path}.npy", mmap_mode="r")
+        self.params = index["params"]
+        self.quantities = index["quantities"]
+        self.iterations = np.array(index["iterations"])
+        self.runs = index["runs"]
+        self._offsets = { self._key(run["params"]): offset for offset, run in enumerate(self.runs) }
+
+    def _key(self, params):
+        return tuple(params[p] for p in self.params)
+
+    def offset(self, **params):
+        """
+        Returns the offset of the run with the given parameters.
+
+        Returns:
+            int: The offset along the run axis.
+        """
+        try:
+            return self._offsets[self._key(params)]
+        except KeyError:
+            raise KeyError(f"No run with parameters {params} in the study store.") from None
+
+    def run(self, **params):
+        """
+        Returns the (lazy) array of the run with the given parameters.
+
+        Returns:
+            np.ndarray: The memory-mapped array of shape (iteration, z, y, x, quantity).
+        """
+        return self.data[self.offset(**params)]
+
+    def quantity(self, name):
+        """
+        Returns the index of the given quantity along the last axis.
+        """
+        return self.quantities.index(name)
+
+
+def build_study_store(path, runs, source, scenario=30, min=100, max=1000, step=10):
+    """
+    Packs the given source of all runs of a study into a memory-mapped study store.
+
+    Args:
+        path (str): The path to the store (without extension).
+        runs (List[Tuple[Dict[str, Any], str]]): The parameters and the run directory of each run.
+        source (str): The filter output to store (e.g. '0_raw-md.csv'), or CFD_SOURCE for the vtk files.
+        scenario (int): The scenario number.
+        min (int): The first iteration to consider.
+        max (int): The last iteration to consider.
+        step (int): The stride between the considered iterations.
+
+    Returns:
+        StudyStore: The opened store.
+    """
+    if not runs:
+        raise ValueError("Cannot build a study store without runs.")
+    params = list(runs[0][0].keys())
+    if len({ tuple(p[k] for k in params) for p, _ in runs }) != len(runs):
+        raise ValueError("The parameters of the runs of a study store must be unique.")
+
+    # the readers only return iterations of this range, so a run with as many iterations contains all of them
+    iterations = list(range(-(-min // step) * step, max + 1, step))
+
+    def load(folder):
+        if source == CFD_SOURCE:
+            return get_array_from_cfd_vtk(folder, scenario=scenario, min=min, max=max, step=step)
+        return get_array_from_filter_csv(folder, source, min=min, max=max, step=step, scenario=scenario)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    ########################################
+    # Fill the memory-mapped array run by run
+    data = None
+    for offset, (_, folder) in enumerate(runs):
+        array = load(folder)
+        if array.shape[0] != len(iterations):
+            raise ValueError(f"'{folder}' contains {array.shape[0]} iterations of '{source}', expected {len(iterations)}.")
+        if data is None:
+            data = np.lib.format.open_memmap(f"{path}.npy", mode="w+", dtype=array.dtype, shape=(len(runs),) + array.shape)
+        if array.shape != data.shape[1:]:
+            raise ValueError(f"'{folder}' has shape {array.shape}, expected {data.shape[1:]}.")
+        data[offset] = array
+    data.flush()
+    del data
+
+    ########################################
+    # Write the sidecar index
+    index = {
+        "source": source,
+        "scenario": scenario,
+        "params": params,
+        "quantities": CFD_QUANTITIES if source == CFD_SOURCE else FILTER_QUANTITIES,
+        "iterations": iterations,
+        "runs": [ { "name": os.path.basename(os.path.normpath(folder)), "params": p } for p, folder in runs ],
+    }
+    with open(f"{path}.json", "w") as f:
+        json.dump(index, f, indent=2)
+
+    return StudyStore(path)
@@ -0,0 +1,71 @@
+import json
+import os
+
+from typing import *
+
+########################################
+# Compact summary of a reduced run, written by the reduce engine as 'reduce_summary.json'.
+# It replaces the raw outputs for all downstream analyses:
+#     {
+#       "run": "MD30_2osc_wv02",
+#       "scenario": 30,
+#       "md_cells": [6, 6, 6],
+#       "window": { "min": 100, "max": 1000, "step": 10 },
+#       "iterations": [100, 110, ...],
+#       "skipped": [],                 # iterations of the window whose vtk file could not be read
+#       "missing": [],                 # iterations of the window that were not written by the simulation
+#       "exit_status": 0,              # of the simulation, null if unknown
+#       "complete": true,              # all iterations of the window reduced and exit status 0
+#       "parameters": { "couette-test/domain/wall-velocity": "0.2 ; 0.0 ; 0.0", ... },
+#       "walltime": { "simulation": 812.4, "reduce": 3.1 },
+#       "metrics": {
+#         "res_raw.diff": {
+#           "filter": "0_raw-md.csv", "metric": "mse", "quantity": "vel_x",
+#           "value": 0.0123,            # over all cells and iterations
+#           "z_profile": [...],         # per z-slice of the MD cells
+#           "cell_profile": [[[...]]],  # per MD cell, indexed by z, y, x
+#           "time": [...]               # per iteration
+#         }, ...
+#       }
+#     }
+
+# Name of the summary within a run directory
+SUMMARY_FILE = "reduce_summary.json"
+
+# Summaries per run directory, see read_summary
+_summaries: Dict[str, Optional[Dict[str, Any]]] = {}
+
+
+def write_summary(folder, summary):
+    """
+    Writes the summary of a run, replacing an existing one atomically.
+
+    Args:
+        folder (str): The run directory.
+        summary (Dict[str, Any]): The summary, see above.
+    """
+    path = os.path.join(folder, SUMMARY_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def read_summary(folder):
+    """
+    Reads the summary of a run. Each summary is read once per process.
+
+    Args:
+        folder (str): The run directory.
+
+    Returns:
+        Optional[Dict[str, Any]]: The summary, None if the run has not been reduced into a summary.
+    """
+    folder = os.path.abspath(folder)
+    if folder not in _summaries:
+        path = os.path.join(folder, SUMMARY_FILE)
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                _summaries[folder] = json.load(f)
+        else:
+            _summaries[folder] = None
+    return _summaries[folder]
@@ -0,0 +1,190 @@
+import re
+
+import numpy as np
+
+from typing import *
+
+########################################
+# Minimal reader for the legacy VTK structured grid files written by MaMiCo's
+# LB solver (e.g. 'LBCouette_r0_c1000.vtk'), ASCII and BINARY.
+# Only the DIMENSIONS header, the origin of the grid and the requested
+# CELL_DATA arrays are parsed, the point coordinates are skipped.
+
+# Keywords starting a new section in a legacy VTK file
+_KEYWORDS = (
+    b"SCALARS", b"VECTORS", b"NORMALS", b"TENSORS", b"LOOKUP_TABLE", b"COLOR_SCALARS",
+    b"TEXTURE_COORDINATES", b"FIELD", b"METADATA", b"POINT_DATA", b"CELL_DATA",
+)
+
+# Candidates for a section keyword: lines starting with an upper case letter
+_LINE_START = re.compile(rb"\n(?=[A-Z])")
+
+# Legacy VTK data types and their numpy counterparts
+_DTYPES = {
+    "unsigned_char": "u1", "char": "i1",
+    "unsigned_short": "u2", "short": "i2",
+    "unsigned_int": "u4", "int": "i4",
+    "unsigned_long": "u8", "long": "i8",
+    "vtktypeuint64": "u8", "vtktypeint64": "i8",
+    "float": "f4", "double": "f8",
+}
+
+# Number of components per attribute type
+_COMPONENTS = { "VECTORS": 3, "NORMALS": 3, "TENSORS": 9 }
+
+
+class StructuredGridCells(NamedTuple):
+    """
+    Cell data of a legacy VTK structured grid.
+
+    Attributes:
+        dimensions (Tuple[int, int, int]): Number of points in x, y, z direction.
+        origin (np.ndarray): Coordinates of the first grid point.
+        cell_data (Dict[str, np.ndarray]): The requested cell arrays,
+            indexed by (z, y, x[, component]).
+    """
+    dimensions: Tuple[int, int, int]
+    origin: np.ndarray
+    cell_data: Dict[str, np.ndarray]
+
+
+def read_structured_grid_cells(path, names=("density", "velocity")):
+    """
+    Reads the given cell arrays of a legacy VTK structured grid file.
+
+    Args:
+        path (str): The path to the vtk file.
+        names (Iterable[str]): The names of the cell arrays to read.
+
+    Returns:
+        StructuredGridCells: The dimensions, origin and requested cell arrays of the grid.
+    """
+    with open(path, "rb") as f:
+        buf = f.read()
+
+    names = set(names)
+    cursor = 0
+
+    def raw_line(cursor):
+        end = buf.find(b"\n", cursor)
+        end = len(buf) if end < 0 else end
+        return buf[cursor:end].decode("ascii", errors="replace").strip(), end + 1
+
+    def next_line(cursor):
+        # skip empty lines
+        line = ""
+        while not line and cursor < len(buf):
+            line, cursor = raw_line(cursor)
+        return line.split(), cursor
+
+    ########################################
+    # Read the header
+    version, cursor = raw_line(cursor)
+    if not version.startswith("# vtk DataFile"):
+        raise ValueError(f"'{path}' is not a legacy VTK file.")
+    _title, cursor = raw_line(cursor)
+    tokens, cursor = next_line(cursor)
+    binary = tokens[0].upper() == "BINARY"
+    tokens, cursor = next_line(cursor)
+    if tokens[:2] != ["DATASET", "STRUCTURED_GRID"]:
+        raise ValueError(f"'{path}' does not contain a structured grid.")
+
+    ########################################
+    # Read the dimensions, the origin and skip the point coordinates
+    dimensions, origin = None, None
+    while origin is None:
+        tokens, cursor = next_line(cursor)
+        if not tokens:
+            raise ValueError(f"'{path}' contains no POINTS section.")
+        if tokens[0] == "DIMENSIONS":
+            dimensions = tuple(int(d) for d in tokens[1:4])
+        elif tokens[0] == "POINTS":
+            n_points, dtype = int(tokens[1]), np.dtype(">" + _DTYPES[tokens[2]])
+            if binary:
+                origin = np.frombuffer(buf, dtype=dtype, count=3, offset=cursor).astype(float)
+                cursor += 3 * n_points * dtype.itemsize
+            else:
+                end = _ascii_block_end(buf, cursor)
+                origin = np.array(buf[cursor:end].split(None, 3)[:3], dtype=float)
+                cursor = end
+        else:
+            raise ValueError(f"Unsupported section '{tokens[0]}' in '{path}'.")
+    if dimensions is None:
+        raise ValueError(f"'{path}' contains no DIMENSIONS.")
+    cell_shape = tuple(d - 1 for d in dimensions[::-1])
+
+    ########################################
+    # Read the requested cell arrays
+    cell_data = {}
+    in_cell_data = False
+    while names - cell_data.keys():
+        tokens, cursor = next_line(cursor)
+        if not tokens:
+            break
+        keyword = tokens[0]
+        if keyword == "CELL_DATA":
+            in_cell_data = True
+            continue
+        if keyword == "POINT_DATA":
+            if in_cell_data:
+                break
+            in_cell_data = False
+            continue
+        if keyword == "METADATA":
+            cursor = _skip_metadata(buf, cursor)
+            continue
+        if keyword == "SCALARS":
+            n_components = int(tokens[3]) if len(tokens) > 3 else 1
+            _lookup_table, cursor = next_line(cursor)
+        elif keyword in _COMPONENTS:
+            n_components = _COMPONENTS[keyword]
+        else:
+            raise ValueError(f"Unsupported section '{keyword}' in '{path}'.")
+        name, dtype = tokens[1], np.dtype(">" + _DTYPES[tokens[2]])
+        shape = cell_shape if n_components == 1 else cell_shape + (n_components,)
+        count = int(np.prod(shape))
+
+        if binary:
+            if in_cell_data and name in names:
+                values = np.frombuffer(buf, dtype=dtype, count=count, offset=cursor)
+                cell_data[name] = values.astype(dtype.newbyteorder("=")).reshape(shape)
+            cursor += count * dtype.itemsize
+        else:
+            end = _ascii_block_end(buf, cursor)
+            if in_cell_data and name in names:
+                values = np.array(buf[cursor:end].split(), dtype=dtype.newbyteorder("="))
+                if values.size != count:
+                    raise ValueError(f"Expected {count} values for '{name}' in '{path}', found {values.size}.")
+                cell_data[name] = values.reshape(shape)
+            cursor = end
+
+    missing = names - cell_data.keys()
+    if missing:
+        raise KeyError(f"Cell arrays {sorted(missing)} not found in '{path}'.")
+
+    return StructuredGridCells(dimensions, origin, cell_data)
+
+
+def _ascii_block_end(buf, cursor):
+    """
+    Returns the end of the ASCII data block starting at cursor,
+    i.e. the position of the next section keyword (or the end of the file).
+    """
+    for match in _LINE_START.finditer(buf, max(cursor - 1, 0)):
+        if buf.startswith(_KEYWORDS, match.end()):
+            return match.end()
+    return len(buf)
+
+
+def _skip_metadata(buf, cursor):
+    """
+    Skips a METADATA block, which is terminated by an empty line.
+    """
+    while cursor < len(buf):
+        end = buf.find(b"\n", cursor)
+        end = len(buf) if end < 0 else end
+        line = buf[cursor:end].strip()
+        cursor = end + 1
+        if not line:
+            break
+    return cursor
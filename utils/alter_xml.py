@@ -1,23 +1,128 @@
 import os
 
+from typing import *
+
 from lxml import etree
 
-from plugins.FabMaMiCo.utils.format_xml import format_xml
+from plugins.FabMaMiCo.utils.format_xml import format_xml, special_line
 
 ###############################################################################
 ## CREATE CONFIGURATIONS
 ###############################################################################
 
+# Marks the varied attributes in the formatted template, see CompiledTemplate
+_SENTINEL = "@@FABMAMICO_{}@@"
+
+# Attribute values that are escaped when formatted by lxml
+_ESCAPED = ('&', '<', '>', '"', '\n', '\r', '\t')
+
+
+class CompiledTemplate:
+    """
+    A couette.xml template, parsed once for a fixed set of varied attributes.
+    Every attribute path is resolved to its element up front. The template is then formatted once,
+    with a sentinel in place of each varied value, and split into the constant fragments between them.
+    Each configuration is rendered by joining the fragments with its values, i.e. in linear time of the output.
+    If the fragments cannot reproduce the output of format_xml, e.g. for values padded to a column width
+    or values which need escaping, the resolved elements are patched and the document is formatted again.
+    """
+
+    def __init__(self, path, keys):
+        """
+        Args:
+            path (str): The path to the template.
+            keys (Iterable[str]): The varied attributes, as element path and attribute, e.g. 'couette-test/domain/wall-velocity'.
+        """
+        parser = etree.XMLParser(remove_comments=False)
+        self.root = etree.parse(path, parser=parser).getroot()
+        self.keys = list(keys)
+        self.attributes = []
+        for key in self.keys:
+            element_path, field = "/".join(key.split("/")[:-1]), key.split("/")[-1]
+            element = self.root.find(element_path)
+            if element is None:
+                raise KeyError(f"The element '{element_path}' of '{key}' does not exist in the template '{path}'.")
+            self.attributes.append((element, field))
+        self.order: List[int] = []
+        self.fragments = self._split()
+
+    def _split(self):
+        """
+        Returns the constant fragments between the varied values of the formatted template,
+        None if the values cannot be inserted into the formatted template.
+        """
+        for i, (element, field) in enumerate(self.attributes):
+            element.set(field, _SENTINEL.format(i))
+            if self._padded(element, field):
+                return None
+        content = format_xml(self.root, self.root.tag)
+        if any(content.count(_SENTINEL.format(i)) != 1 for i in range(len(self.attributes))):
+            return None
+        # the varied values in the order of their appearance
+        self.order = sorted(range(len(self.attributes)), key=lambda i: content.index(_SENTINEL.format(i)))
+        fragments = []
+        for i in self.order:
+            fragment, content = content.split(_SENTINEL.format(i))
+            fragments.append(fragment)
+        fragments.append(content)
+        return fragments
+
+    def _padded(self, element, field):
+        # the boundary attributes of special lines are padded to a column width, see format_xml
+        path = "/".join([ e.tag for e in reversed(list(element.iterancestors())) ] + [element.tag])
+        if path not in special_line:
+            return False
+        attributes = list(element.attrib.keys())
+        return "bottom-south-west" not in attributes or attributes.index(field) >= attributes.index("bottom-south-west")
+
+    def render(self, data):
+        """
+        Returns the formatted couette.xml with the given values.
+
+        Args:
+            data (Dict[str, Any]): The value of each varied attribute.
+
+        Returns:
+            str: The content of the couette.xml file.
+        """
+        values = [ str(data[key]) for key in self.keys ]
+        if self.fragments is not None and not any(c in value for value in values for c in _ESCAPED):
+            parts = [self.fragments[0]]
+            for i, fragment in zip(self.order, self.fragments[1:]):
+                parts.append(values[i])
+                parts.append(fragment)
+            return "".join(parts)
+        for (element, field), value in zip(self.attributes, values):
+            element.set(field, value)
+        return format_xml(self.root, self.root.tag)
+
+
+# Compiled templates per template path and varied attributes
+_templates = {}
+
+
+def compile_template(dir_path, template, keys):
+    """
+    Returns the compiled template for the given varied attributes, compiled once per process.
+
+    Args:
+        dir_path (str): The config directory, containing the template.
+        template (str): The file name of the template.
+        keys (Iterable[str]): The varied attributes, see CompiledTemplate.
+
+    Returns:
+        CompiledTemplate: The compiled template.
+    """
+    path = os.path.abspath(os.path.join(dir_path, template))
+    keys = tuple(keys)
+    if (path, keys) not in _templates:
+        _templates[(path, keys)] = CompiledTemplate(path, keys)
+    return _templates[(path, keys)]
+
+
 def alter_xml(dir_path, data, write=None):
-    parser = etree.XMLParser(remove_comments=False)
-    my_xml = etree.parse(os.path.join(dir_path, data['template']), parser=parser)
-    root = my_xml.getroot()
-    for key, value in data.items():
-        if key == "name" or key == "template":
-            continue
-        path, field = "/".join(key.split("/")[:-1]), key.split("/")[-1]
-        root.find(path).set(field, str(value))
-    xml_content = format_xml(root, root.tag)
+    keys = [ key for key in data.keys() if key != "name" and key != "template" ]
+    xml_content = compile_template(dir_path, data['template'], keys).render(data)
 
     if write is not None:
         this_config_path = os.path.join(dir_path, "SWEEP", data['name'])
@@ -25,4 +130,4 @@ def alter_xml(dir_path, data, write=None):
         with open(os.path.join(this_config_path, "couette.xml"), 'w') as file:
             file.write(xml_content)
 
-    return xml_content
\ No newline at end of file
+    return xml_content
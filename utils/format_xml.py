@@ -6,7 +6,8 @@ from lxml import etree
 
 m_encoding = 'UTF-8'
 
-multiline = [
+# Elements whose attributes are written one per line, by their path from the root
+multiline = {
     'scenario-configuration/couette-test/domain',
     'scenario-configuration/couette-test/coupling',
     'scenario-configuration/couette-test/macroscopic-solver',
@@ -14,85 +15,82 @@ multiline = [
     'scenario-configuration/mamico/coupling-cell-configuration',
     'scenario-configuration/molecular-dynamics/molecule-configuration',
     'scenario-configuration/molecular-dynamics/simulation-configuration',
-]
+}
 
-special_line = [
+# Elements whose boundary attributes are written in a grid, by their path from the root
+special_line = {
     'scenario-configuration/molecular-dynamics/domain-configuration',
-]
+}
 
 
-def _node_to_multiline(node, indent=0):
-    res = ""
-    tag = node.tag
-    attr = node.attrib
-    formatted_string = '\n'.join(f"{'  ' * (indent+1)}{attr}=\"{value}\"" for attr, value in attr.items())
-    res += "  " * indent + f"<{tag}\n"
-    res += formatted_string + "\n"
-    res += "  " * indent + "/>"
-    return res
+def _node_to_multiline(node, indent, write):
+    attributes = '\n'.join(f"{'  ' * (indent+1)}{attr}=\"{value}\"" for attr, value in node.attrib.items())
+    write("  " * indent + f"<{node.tag}\n" + attributes + "\n" + "  " * indent + "/>")
 
 
-def _node_to_specialline(node, indent=0):
-    res = ""
-    tag = node.tag
-    res += "  " * indent + f"<{tag}\n"
+def _node_to_specialline(node, indent, write):
+    res = ["  " * indent + f"<{node.tag}\n"]
     attr, vals = node.attrib.keys(), node.attrib.values()
     idx = 0
     while attr[idx] != "bottom-south-west":
-        res += "  " * (indent+1) + f"{attr[idx]}=\"{vals[idx]}\"\n"
+        res.append("  " * (indent+1) + f"{attr[idx]}=\"{vals[idx]}\"\n")
         idx += 1
 
     x = 0
-    res += "  " * (indent+1)
+    res.append("  " * (indent+1))
     while idx < len(attr)-1:
         if attr[idx] == "east":
-            res += f"{' ' * 32}"
+            res.append(' ' * 32)
             x += 1
         a = f"{attr[idx]}=\"{vals[idx]}\""
-        res += f"{a:<32}"
+        res.append(f"{a:<32}")
         idx += 1
         x += 1
         if x % 3 == 0:
-            res += "\n" + "  " * (indent+1)
-    res += f"{attr[idx]}=\"{vals[idx]}\"\n"
+            res.append("\n" + "  " * (indent+1))
+    res.append(f"{attr[idx]}=\"{vals[idx]}\"\n")
+    res.append("  " * indent + "/>")
+    write("".join(res))
 
-    # formatted_string = '\n'.join(f"{'  ' * (indent+1)}{attr}=\"{value}\"" for attr, value in attr.items())
-    # res += "  " * indent + f"<{tag}\n"
-    # res += formatted_string + "\n"
-    res += "  " * indent + "/>"
-    return res
 
-
-def _rec_iter(node, level, path):
-    res = ""
+def _rec_iter(node, level, path, write):
+    indent = "  " * level
     for el in node:
         if type(el) == etree._Comment:
-            res += "  " * level + etree.tostring(el, encoding=m_encoding, with_tail=False).decode(m_encoding) + "\n"
+            write(indent + etree.tostring(el, encoding=m_encoding, with_tail=False).decode(m_encoding) + "\n")
+            continue
+        my_path = path + "/" + el.tag
+        if any(type(child) != etree._Comment for child in el):
+            write(indent + "<" + el.tag + "".join(f" {key}=\"{value}\"" for key, value in el.attrib.items()) + ">\n")
+            _rec_iter(el, level+1, my_path, write)
+            write(indent + "</" + el.tag + ">\n")
+        elif my_path in multiline:
+            _node_to_multiline(el, level, write)
+            write("\n")
+        elif my_path in special_line:
+            _node_to_specialline(el, level, write)
+            write("\n")
         else:
-            children = len([child for child in el if type(child) != etree._Comment])
-            if children > 0:
-                res += "  " * level + "<" + el.tag
-                if len(el.attrib) > 0:
-                    res += "".join([f" {key}=\"{value}\"" for key, value in el.attrib.items()])
-                res += ">\n"
-                res += _rec_iter(el, level+1, path + [el.tag])
-                res += "  " * level + "</" + el.tag + ">\n"
-                continue
-            my_path = "/".join(path + [el.tag])
+            write(indent + etree.tostring(el, encoding=m_encoding, with_tail=False).decode(m_encoding) + "\n")
+
 
-            if my_path in multiline:
-                res += _node_to_multiline(el, level) + "\n"
-            elif my_path in special_line:
-                res += _node_to_specialline(el, level) + "\n"
-            else:
-                res += "  " * level + etree.tostring(el, encoding=m_encoding, with_tail=False).decode(m_encoding) + "\n"
-            
-    return res
+def format_xml(node, root_tag, file=None):
+    """
+    Formats a couette.xml document. The fragments are written one after another,
+    either to the given file or collected and joined once, so the time is linear in the size of the document.
 
+    Args:
+        node (etree._Element): The root element.
+        root_tag (str): The tag of the root element.
+        file (Optional[TextIO]): The file to write to.
 
-def format_xml(node, root_tag):
-    res  =  '<?xml version="1.0"?>\n\n'
-    res += f'<{root_tag}>\n'
-    res += _rec_iter(node, 1, [root_tag])
-    res += f'</{root_tag}>'
-    return res
+    Returns:
+        Optional[str]: The formatted document, None if written to a file.
+    """
+    parts = []
+    write = parts.append if file is None else file.write
+    write('<?xml version="1.0"?>\n\n')
+    write(f'<{root_tag}>\n')
+    _rec_iter(node, 1, root_tag, write)
+    write(f'</{root_tag}>')
+    return "".join(parts) if file is None else None
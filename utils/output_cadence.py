@@ -0,0 +1,85 @@
+import os
+
+import yaml
+
+from plugins.FabMaMiCo.utils.alter_xml import compile_template
+
+###############################################################################
+## OUTPUT CADENCE OF THE SWEEP
+###############################################################################
+
+# Window of the reduce engine if reduce.yml does not define one,
+# see DEFAULT_WINDOW in scripts/postprocess/reduce.py
+DEFAULT_WINDOW = { "min": 100, "max": 1000, "step": 10 }
+
+# Number of coupling cycles of the simulation
+COUPLING_CYCLES = "couette-test/coupling/coupling-cycles"
+
+
+def reduce_window(dir_path):
+    """
+    Reads the analysis window of the reduce engine from the 'reduce.yml' file of a config directory.
+
+    Args:
+        dir_path (str): The config directory.
+
+    Returns:
+        Optional[Dict[str, int]]: The window with the keys 'min', 'max' and 'step', None if there is no 'reduce.yml' file.
+    """
+    path = os.path.join(dir_path, "reduce.yml")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        window = { **DEFAULT_WINDOW, **(yaml.safe_load(f) or {}).get("window", {}) }
+    if window["step"] <= 0 or window["min"] % window["step"] != 0:
+        raise ValueError(f"The window {window} in '{path}' must start at a multiple of its step, as vtk files are written every 'step' coupling cycles.")
+    return window
+
+
+def output_cadence(window):
+    """
+    Derives the couette.xml output parameters from the analysis window of the reduce engine,
+    so that MaMiCo only writes the snapshots reduce consumes:
+      - the LB solver writes a vtk file every 'step' coupling cycles,
+      - the couette test does not write its own csv output.
+    The filter outputs are written every coupling cycle, as the filter pipeline has no output interval.
+    The number of coupling cycles is not changed, as it also defines the period of the oscillating wall,
+    see check_coupling_cycles.
+
+    Args:
+        window (Optional[Dict[str, int]]): The window, see reduce_window.
+
+    Returns:
+        Dict[str, Any]: The couette.xml parameters for alter_xml, empty if there is no window.
+    """
+    if window is None:
+        return {}
+    return {
+        "couette-test/coupling/write-csv-every-timestep": 0,
+        "couette-test/macroscopic-solver/plot-every-timestep": window["step"],
+    }
+
+
+def check_coupling_cycles(dir_path, data, window):
+    """
+    Makes sure that a configuration simulates all iterations of the analysis window.
+
+    Args:
+        dir_path (str): The config directory, containing the template.
+        data (Dict[str, Any]): The configuration as for alter_xml.
+        window (Optional[Dict[str, int]]): The window, see reduce_window.
+
+    Raises:
+        ValueError: If the simulation ends before the last iteration of the window.
+    """
+    if window is None:
+        return
+    cycles = data.get(COUPLING_CYCLES)
+    if cycles is None:
+        element_path, field = COUPLING_CYCLES.rsplit("/", 1)
+        cycles = compile_template(dir_path, data['template'], ()).root.find(element_path).get(field)
+    if int(cycles) <= window["max"]:
+        raise ValueError(
+            f"The configuration '{data['name']}' runs {cycles} coupling cycles, "
+            f"but the window of reduce.yml ends at iteration {window['max']}."
+        )
@@ -0,0 +1,137 @@
+import argparse
+import os
+
+from itertools import product
+from typing import *
+
+import yaml
+
+from plugins.FabMaMiCo.utils.output_cadence import check_coupling_cycles, output_cadence, reduce_window
+from plugins.FabMaMiCo.utils.sweep_writer import write_sweep
+
+###############################################################################
+## SWEEP SPECIFICATION
+###############################################################################
+# The configurations of an ensemble are declared in a 'sweep.yml' file in the config directory, e.g.
+#     template: template_nlm.xml
+#     name: "nlm_{domain}_{oscillations}_wv{wall_velocity:.1f}_sigsqrel{sigsq_rel:.4f}"
+#     strip: "."                # characters removed from the names
+#     set:                      # attributes of all configurations
+#       couette-test/domain/channelheight: 50
+#     axes:
+#       - name: oscillations    # grouped axis: each value sets several attributes
+#         values:
+#           - label: 2osc
+#             set:
+#               couette-test/domain/wall-oscillations: 2
+#       - name: wall_velocity   # scalar axis: each value sets one attribute
+#         key: couette-test/domain/wall-velocity
+#         format: "{:.1f} ; 0.0 ; 0.0"
+#         values: [0.2, 0.4]
+#       - name: sigsq_rel
+#         key: filter-pipeline/post-multi-instance/nlm-junction/NLM/sigsq_rel
+#         values: [0.0, 0.1]
+#     constraints:              # configurations for which any expression is false are skipped
+#       - "sigsq_rel <= wall_velocity"
+# The configurations are the product of all axes, in the order of the axes.
+# The names and constraints refer to the label of each grouped axis and to the value of each scalar axis.
+# If the config directory contains a reduce.yml, the output parameters are derived from its window, see output_cadence,
+# and every configuration must simulate all iterations of the window.
+
+# Name of the specification within a config directory
+SWEEP_FILE = "sweep.yml"
+
+
+def load_sweep_spec(dir_path):
+    """
+    Loads and validates the sweep.yml file of a config directory.
+
+    Args:
+        dir_path (str): The config directory.
+
+    Returns:
+        Dict[str, Any]: The specification, see above.
+    """
+    path = os.path.join(dir_path, SWEEP_FILE)
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f) or {}
+    if "name" not in spec:
+        raise ValueError(f"No name defined in '{path}'.")
+    spec.setdefault("set", {})
+    spec.setdefault("axes", [])
+    spec.setdefault("constraints", [])
+    spec.setdefault("strip", "")
+    for axis in spec["axes"]:
+        if "name" not in axis or "values" not in axis:
+            raise ValueError(f"Each axis in '{path}' needs a 'name' and 'values', got {axis}.")
+        grouped = all(isinstance(value, dict) for value in axis["values"])
+        if grouped == ("key" in axis):
+            raise ValueError(f"The axis '{axis['name']}' in '{path}' needs either a 'key' or values with 'label' and 'set'.")
+        if grouped and not all("label" in value for value in axis["values"]):
+            raise ValueError(f"Each value of the axis '{axis['name']}' in '{path}' needs a 'label'.")
+    if "template" not in spec["set"] and "template" in spec:
+        spec["set"] = { "template": spec["template"], **spec["set"] }
+    return spec
+
+
+def _axis_points(axis):
+    """
+    Returns the points of an axis as tuples (field, attributes).
+    """
+    if "key" in axis:
+        return [ (value, { axis["key"]: axis["format"].format(value) if "format" in axis else value }) for value in axis["values"] ]
+    return [ (value["label"], value.get("set", {})) for value in axis["values"] ]
+
+
+def sweep_configurations(dir_path, spec=None):
+    """
+    Enumerates the configurations of a sweep lazily, as input for write_sweep.
+
+    Args:
+        dir_path (str): The config directory.
+        spec (Optional[Dict[str, Any]]): The specification, loaded from the sweep.yml file if None.
+
+    Yields:
+        Dict[str, Any]: The name, template and attributes of each configuration.
+    """
+    if spec is None:
+        spec = load_sweep_spec(dir_path)
+    window = reduce_window(dir_path)
+    cadence = output_cadence(window)
+    names = [ axis["name"] for axis in spec["axes"] ]
+    constraints = [ compile(c, f"{SWEEP_FILE}: {c}", "eval") for c in spec["constraints"] ]
+    for point in product(*[ _axis_points(axis) for axis in spec["axes"] ]):
+        fields = { name: field for name, (field, _) in zip(names, point) }
+        if not all(eval(c, { "__builtins__": {} }, fields) for c in constraints):
+            continue
+        data = { **cadence, **spec["set"] }
+        for _, attributes in point:
+            data.update(attributes)
+        name = spec["name"].format(**fields)
+        for c in spec["strip"]:
+            name = name.replace(c, "")
+        data["name"] = name
+        check_coupling_cycles(dir_path, data, window)
+        yield data
+
+
+def generate_sweep_from_spec(dir_path, workers=None):
+    """
+    Writes the configurations declared in the sweep.yml file of a config directory to its SWEEP directory.
+
+    Args:
+        dir_path (str): The config directory.
+        workers (Optional[int]): The number of threads writing the files, see write_sweep.
+
+    Returns:
+        int: The number of configurations in the sweep.
+    """
+    return write_sweep(dir_path, sweep_configurations(dir_path), workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates the SWEEP directory of a config directory from its sweep.yml")
+    parser.add_argument('config_dir', type=str, help='Path to the config directory')
+    parser.add_argument('--workers', type=int, default=None, help='Threads writing the files')
+    args = parser.parse_args()
+    generate_sweep_from_spec(args.config_dir, workers=args.workers)
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import shutil
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import *
+
+from plugins.FabMaMiCo.utils.alter_xml import compile_template
+
+###############################################################################
+## WRITE THE SWEEP DIRECTORY
+###############################################################################
+
+# Number of configurations rendered before their files are written,
+# bounds the memory for sweeps of arbitrary size
+BATCH_SIZE = 512
+
+
+def _write_config(run_dir, content, create):
+    """
+    Writes the couette.xml of a run, unless the existing file has the same content.
+
+    Returns:
+        int: The number of written bytes, 0 if unchanged.
+    """
+    path = os.path.join(run_dir, "couette.xml")
+    data = content.encode()
+    if create:
+        os.mkdir(run_dir)
+    elif os.path.isfile(path):
+        with open(path, "rb") as file:
+            if hashlib.sha1(file.read()).digest() == hashlib.sha1(data).digest():
+                return 0
+    with open(path, "wb") as file:
+        file.write(data)
+    return len(data)
+
+
+def write_sweep(dir_path, configurations, workers=None, prune=True):
+    """
+    Writes the couette.xml of each configuration to 'SWEEP/<name>/couette.xml' in the config directory.
+    The configurations are rendered from their compiled templates (see alter_xml) in this thread,
+    and written by a pool of threads, as writing many small files is dominated by the latency
+    of the (network) filesystem. The existing run directories are listed once,
+    and only the missing ones are created, without checking their parents.
+    Files whose content hash is unchanged are not rewritten, so their modification time is kept
+    and transferring the SWEEP directory again only transfers the changed configurations.
+    Run directories that are no longer part of the sweep are removed once all configurations are written.
+
+    Args:
+        dir_path (str): The config directory.
+        configurations (Iterable[Dict[str, Any]]): The configurations as for alter_xml,
+            with the keys 'name' and 'template' and the varied attributes. May be a generator.
+        workers (Optional[int]): The number of threads writing the files, the default of ThreadPoolExecutor if None.
+        prune (bool): Whether to remove the run directories of configurations not in the sweep.
+
+    Returns:
+        int: The number of configurations in the sweep.
+    """
+    start = time.perf_counter()
+    sweep_dir = os.path.join(dir_path, "SWEEP")
+    os.makedirs(sweep_dir, exist_ok=True)
+    existing = set(os.listdir(sweep_dir))
+    names: Set[str] = set()
+
+    n_configs, n_writes, n_bytes = 0, 0, 0
+    configurations = iter(configurations)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(configurations, BATCH_SIZE))
+            if not batch:
+                break
+            futures = []
+            for data in batch:
+                if data['name'] in names:
+                    raise ValueError(f"The configuration '{data['name']}' is generated more than once.")
+                names.add(data['name'])
+                keys = [ key for key in data.keys() if key != "name" and key != "template" ]
+                content = compile_template(dir_path, data['template'], keys).render(data)
+                create = data['name'] not in existing
+                futures.append(executor.submit(_write_config, os.path.join(sweep_dir, data['name']), content, create))
+            written = [ future.result() for future in futures ]
+            n_bytes += sum(written)
+            n_writes += sum(1 for w in written if w > 0)
+            n_configs += len(batch)
+
+        # remove the run directories of earlier sweeps
+        stale = sorted(
+            name for name in existing - names
+            if not name.startswith(".") and os.path.isdir(os.path.join(sweep_dir, name))
+        )
+        if prune:
+            for future in [ executor.submit(shutil.rmtree, os.path.join(sweep_dir, name)) for name in stale ]:
+                future.result()
+
+    seconds = time.perf_counter() - start
+    print(
+        f"Generated {n_configs} XML-files in the SWEEP directory: {n_writes} written, {n_configs - n_writes} unchanged, "
+        f"{len(stale)} stale {'removed' if prune else 'kept'} "
+        f"({n_bytes / 1e6:.1f} MB in {seconds:.2f} s, {n_configs / max(seconds, 1e-9):.0f} files/s)."
+    )
+    return n_configs